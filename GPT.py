@@ -1,40 +1,156 @@
-from dotenv import load_dotenv
-from openai import OpenAI
+import re
+import threading
 import requests
+from config import Config
+from cache import content_key
+from metrics import span
+from upstream import openai_upstream
+
+SYSTEM_PROMPT = (
+    "You are News Perspective, a service that compares the factual claims of news articles. "
+    "Compare the article the user is reading with what other articles are saying. "
+    "Call the first one the current article and the second one other articles. "
+    "Output a concise summary of where the facts agree and differ."
+)
+
+class Tokenizer:
+    """Counts and truncates tokens locally, falling back to a word/punctuation estimate without tiktoken"""
+
+    def __init__(self, model):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._encoding = self._load_encoding()
+                    # Only after _encoding is set, so no thread sees a half-loaded tokenizer
+                    self._loaded = True
+        return self._encoding
+
+    def _load_encoding(self):
+        try:
+            import tiktoken
+        except ImportError:
+            return None
+        try:
+            try:
+                return tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                return tiktoken.get_encoding('o200k_base')
+        except Exception as e:
+            # The encoding file is fetched on first use; stay offline-safe
+            print(f"Falling back to estimated token counts: {e}")
+            return None
+
+    def truncate(self, text, max_tokens):
+        """Return the longest prefix of text within max_tokens, and its token count"""
+        encoding = self.encoding
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text, len(tokens)
+            return encoding.decode(tokens[:max_tokens]), max_tokens
+
+        # Roughly one token per word or punctuation mark
+        pieces = list(re.finditer(r'\w+|[^\w\s]', text))
+        if len(pieces) <= max_tokens:
+            return text, len(pieces)
+        return text[:pieces[max_tokens].start()].rstrip(), max_tokens
+
+    def count(self, text):
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return len(re.findall(r'\w+|[^\w\s]', text))
+
+    def fit(self, texts, budget):
+        """Truncate texts to share budget tokens, giving what short texts leave unused to longer ones"""
+        fitted = list(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        remaining = budget
+        for position, index in enumerate(order):
+            share = remaining // (len(texts) - position)
+            fitted[index], used = self.truncate(texts[index], share)
+            remaining -= used
+        return fitted
 
 class GPTCompareArticles:
     def __init__(self, OPENAI_API_KEY):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.api_key = OPENAI_API_KEY
+        self._client = None
+        self.model = Config.GPT_MODEL
+        self.tokenizer = Tokenizer(self.model)
+
+    @property
+    def client(self):
+        # The openai package takes about half a second to import, so wait until the first comparison
+        if self._client is None:
+            from openai import OpenAI
+            # Retries are handled by openai_upstream, which also respects the rate limits
+            self._client = OpenAI(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def _costs(self, messages):
+        # Quota use of one completion: the prompt plus the most it may write
+        tokens = sum(self.tokenizer.count(message['content']) for message in messages)
+        return {'tokens': tokens + Config.GPT_MAX_OUTPUT_TOKENS}
+
+    def _messages(self, article_1, article_2):
+        article_1, article_2 = self.tokenizer.fit([article_1, article_2], Config.GPT_INPUT_TOKEN_BUDGET)
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Current article:\n```{article_1}```\n\nOther articles:\n```{article_2}```"}
+        ]
 
     def compare_articles(self, article_1: str, article_2: str) -> str:
         try:
-            model = "gpt-4o-mini"
-            conversation_history = [
-                {"role": "system", "content": "You are a helpful assistant."}
-            ]
-            
-            prompt_article_one = f"You are News Perspective a company that looks for articles online and compare their factual analysis. Your task is to compare the facts of two articles the articles the user is currently reading and other articles in the market. Output summary of your analysis, instead of first article use the term current article and instead of second article use the term other articles. Keep your response as concise as possible. I will give you what other articles are saying in the next prompt but here is the article the user is currently reading: `{article_1}`"
-            conversation_history.append({"role": "user", "content": prompt_article_one})
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=conversation_history
-            )
-            output = response.choices[0].message.content.strip()
-
-            conversation_history.append({"role": "assistant", "content": output})
-            
-            prompt_article_two = f"Here is what other articles are saying {article_2}"
-            conversation_history.append({"role": "user", "content": prompt_article_two})
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=conversation_history
-            )
-            result = response.choices[0].message.content.strip()
-
-            return result
+            messages = self._messages(article_1, article_2)
+            with span('gpt_compare'):
+                # Identical concurrent comparisons share one completion
+                response = openai_upstream.call(
+                    content_key(self.model, *(message['content'] for message in messages)),
+                    self.client.chat.completions.create,
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=Config.GPT_MAX_OUTPUT_TOKENS,
+                    timeout=Config.GPT_TIMEOUT,
+                    budget=Config.GPT_TIMEOUT,
+                    costs=self._costs(messages)
+                )
+            return response.choices[0].message.content.strip()
         except requests.exceptions.RequestException as e:
             return f"An error occurred: {e}"
 
+    def compare_articles_stream(self, article_1: str, article_2: str):
+        """Yield the comparison in pieces as the model produces it"""
+        messages = self._messages(article_1, article_2)
+        # Timed up to the first token; the rest is paced by the client reading the stream
+        with span('gpt_compare'):
+            # A stream can't be shared between callers, so no coalescing key
+            stream = openai_upstream.call(
+                None,
+                self.client.chat.completions.create,
+                model=self.model,
+                messages=messages,
+                max_tokens=Config.GPT_MAX_OUTPUT_TOKENS,
+                timeout=Config.GPT_TIMEOUT,
+                stream=True,
+                budget=Config.GPT_TIMEOUT,
+                costs=self._costs(messages)
+            )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
 if __name__ == '__main__':
     article_1 = """
     Proponents of strong climate change policies argue that immediate and aggressive action is essential to avert catastrophic global warming. With rising temperatures, extreme weather events, and the growing toll of natural disasters, the need for comprehensive climate action is clearer than ever. Advocates support measures like rejoining the Paris Agreement, pushing for a Green New Deal, and implementing carbon taxes or emissions regulations to transition away from fossil fuels.
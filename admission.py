@@ -0,0 +1,73 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from metrics import admission_rejections, span
+
+class Overloaded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionLimiter:
+    """Run at most ``limit`` NLP analyses at once in this process and let ``max_queue`` more wait.
+
+    Anyone beyond that, or anyone who waited ``queue_timeout`` seconds
+    without getting a slot, gets ``Overloaded`` at once, with a Retry-After
+    estimated from how long analyses have been taking. ``slot(wait=True)``
+    always queues, for work that was already admitted, such as the later
+    chunks of a batch whose response has started.
+    """
+
+    def __init__(self, limit, max_queue, queue_timeout):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+        # Moving average of how long a slot is held
+        self._average = 1.0
+
+    @contextmanager
+    def slot(self, wait=False):
+        self._acquire(wait)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._condition:
+                self.running -= 1
+                self._average += 0.2 * (elapsed - self._average)
+                self._condition.notify()
+
+    def _acquire(self, wait):
+        with self._condition:
+            if self.running < self.limit and self.waiting == 0:
+                self.running += 1
+                return
+            if not wait and self.waiting >= self.max_queue:
+                admission_rejections.inc(reason='queue_full')
+                raise Overloaded('Too many analyses in progress', self._retry_after())
+
+            self.waiting += 1
+            try:
+                with span('nlp_queue'):
+                    deadline = time.monotonic() + self.queue_timeout
+                    while self.running >= self.limit:
+                        if wait:
+                            self._condition.wait()
+                            continue
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            admission_rejections.inc(reason='queue_timeout')
+                            raise Overloaded('Timed out waiting for an analysis slot', self._retry_after())
+                        self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.running += 1
+
+    def _retry_after(self):
+        # Whole seconds until the queue ahead would have drained
+        return max(1, math.ceil(self._average * (self.waiting + 1) / self.limit))
@@ -0,0 +1,53 @@
+"""Analyze many articles from the command line, writing one NDJSON result per line.
+
+Input is NDJSON with one {"article_text": ...} object (or JSON string) per line:
+
+    python analyze_batch.py feed.ndjson --n-process 4 > results.ndjson
+"""
+import argparse
+import json
+import sys
+from config import Config
+from models.article_analyzer import ArticleAnalyzer
+from pipeline import AnalysisPipeline
+
+def read_articles(stream):
+    texts = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        texts.append(item['article_text'] if isinstance(item, dict) else item)
+    return texts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze many articles and write NDJSON results to stdout')
+    parser.add_argument('input', nargs='?', default='-', help='NDJSON input file, or - for stdin')
+    parser.add_argument('--batch-size', type=int, default=Config.BATCH_SIZE)
+    parser.add_argument('--n-process', type=int, default=1)
+    parser.add_argument('--related', action='store_true', help='Look up related articles')
+    parser.add_argument('--compare', action='store_true', help='Compare with a related article using GPT (implies --related)')
+    args = parser.parse_args(argv)
+
+    if args.input == '-':
+        texts = read_articles(sys.stdin)
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            texts = read_articles(f)
+
+    gpt = None
+    if args.compare:
+        from GPT import GPTCompareArticles
+        gpt = GPTCompareArticles(Config.OPENAI_API_KEY)
+
+    pipeline = AnalysisPipeline.from_config(ArticleAnalyzer(Config.NEWS_API_KEY), gpt)
+    # Nothing else shares this process's CPUs, and slots would restart the worker pool per chunk
+    pipeline.admission = None
+    results = pipeline.run_batch(texts, args.batch_size, args.n_process,
+                                 args.related or args.compare, args.compare)
+    for index, result in enumerate(results):
+        print(json.dumps({'index': index, **result}), flush=True)
+
+if __name__ == '__main__':
+    main()
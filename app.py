@@ -1,34 +1,84 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from config import Config
 from models.article_analyzer import ArticleAnalyzer
-from get_content_using_url import get_page_text
+from models.registry import check_resources
 from GPT import GPTCompareArticles
-import nltk
+from pipeline import AnalysisPipeline
+from admission import Overloaded
+from jobs import JobQueue, JobWorkerPool
+from responses import compact_response, dumps, json_response, stream_response, wants_compact
+import metrics
+import itertools
+import json
 import os
-import ssl
+import time
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_REQUEST_BYTES
 
 if Config.ALLOWED_ORIGINS == ['*']:
     CORS(app)
 else:
     CORS(app, origins=Config.ALLOWED_ORIGINS)
 
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-
-nltk.download('punkt_tab', quiet=True)
-nltk.download('vader_lexicon', quiet=True)
-nltk.download('stopwords', quiet=True)
+# Models and NLTK data are installed at build time (see dockerfile); only look for them here
+check_resources(download=Config.NLTK_DOWNLOAD)
 
 analyzer = ArticleAnalyzer(Config.NEWS_API_KEY)
 gpt = GPTCompareArticles(Config.OPENAI_API_KEY)
 
+pipeline = AnalysisPipeline.from_config(analyzer, gpt)
+
+job_queue = JobQueue(Config.JOB_QUEUE_PATH, Config.JOB_LEASE_SECONDS,
+                     Config.JOB_MAX_ATTEMPTS, Config.JOB_RESULT_TTL)
+def run_job(job):
+    compact = job.get('format') == 'compact'
+    response = pipeline.complete(job['article_text'], job['analysis'], url=job.get('url'),
+                                 sentence_spans=compact)
+    if compact:
+        return compact_response(response, job['article_text'])
+    return response
+
+job_workers = JobWorkerPool(job_queue, run_job, Config.JOB_WORKERS)
+
+@app.before_request
+def start_timing():
+    g.request_start = time.perf_counter()
+    if Config.SERVER_TIMING:
+        metrics.start_request_timings()
+
+@app.after_request
+def record_timing(response):
+    elapsed = time.perf_counter() - g.request_start
+    timings = metrics.request_timings()
+    if timings is not None:
+        # Streamed responses only carry the stages that ran before the first chunk
+        response.headers['Server-Timing'] = metrics.server_timing_header(
+            timings + [('total', elapsed)]
+        )
+    if Config.METRICS_ENABLED:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics.http_request_seconds.observe(elapsed, endpoint=endpoint)
+    return response
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({
+        'error': f'Request body is larger than {Config.MAX_REQUEST_BYTES} bytes',
+        'status': 'error'
+    }), 413
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    return jsonify({
+        'error': str(e),
+        'status': 'error',
+        'retry_after': e.retry_after
+    }), 503, {'Retry-After': str(e.retry_after)}
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_article():
     try:
@@ -42,32 +92,183 @@ def analyze_article():
             
         article_text = data['article_text']
         
-        analysis = analyzer.analyze_article(article_text)
+        if request.args.get('mode') == 'async':
+            return start_analysis_job(article_text, data.get('url'))
         
-        related_articles = analyzer.find_related_articles(analysis['keywords'])
+        compact = wants_compact()
+        response = pipeline.run(article_text, data.get('url'), sentence_spans=compact)
         
-        response = {
-            'status': 'success',
-            'analysis': analysis['bias_analysis'],
-            'keywords': analysis['keywords'],  
-            'political_analysis': analysis['political_analysis'],
-            'related_articles': related_articles,
-            'GPT_Compare': ''
-        }
-        
-        if len(related_articles) > 0:
-            content = get_page_text(related_articles[0]['url'])
-            comparision_result = gpt.compare_articles(article_text, content)
-            response['GPT_Compare'] = comparision_result       
-             
+        if compact:
+            return json_response(compact_response(response, article_text))
         return jsonify(response)
         
+    except (RequestEntityTooLarge, Overloaded):
+        raise
     except Exception as e:
         return jsonify({
             'error': str(e),
             'status': 'error'
         }), 500
 
+def start_analysis_job(article_text, url):
+    # The NLP runs now; related articles, page fetches and GPT run in the job
+    compact = wants_compact()
+    response, analysis = pipeline.run_local(article_text, sentence_spans=compact)
+    job_id = job_queue.enqueue({
+        'article_text': article_text,
+        'url': url,
+        'analysis': analysis,
+        'format': 'compact' if compact else 'full'
+    })
+    job_workers.start()
+    job_workers.notify()
+    accepted = {
+        'status': 'accepted',
+        'job_id': job_id,
+        'job_url': f'/api/jobs/{job_id}',
+        'events_url': f'/api/jobs/{job_id}/events'
+    }
+    if compact:
+        return json_response({**compact_response(response, article_text), **accepted}, 202)
+    return jsonify({**response, **accepted}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job_workers.start()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Unknown job',
+            'status': 'error'
+        }), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job_workers.start()
+    if job_queue.get(job_id) is None:
+        return jsonify({
+            'error': 'Unknown job',
+            'status': 'error'
+        }), 404
+    
+    def generate():
+        last_status = None
+        last_sent = time.monotonic()
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Job expired"}\n\n'
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                last_sent = time.monotonic()
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                if job['status'] in ('done', 'failed'):
+                    return
+            elif time.monotonic() - last_sent > 15:
+                # Comment line that keeps proxies from closing an idle stream
+                last_sent = time.monotonic()
+                yield ': keep-alive\n\n'
+            time.sleep(0.25)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_article_stream():
+    data = request.get_json(silent=True)
+    
+    if not data or 'article_text' not in data:
+        return jsonify({
+            'error': 'No article text provided',
+            'status': 'error'
+        }), 400
+    
+    article_text = data['article_text']
+    compact = wants_compact()
+    events = pipeline.run_stream(article_text, data.get('url'), sentence_spans=compact)
+    try:
+        # The analysis runs before the response starts, so an overloaded worker can still answer 503
+        first = [next(events)]
+    except Overloaded:
+        raise
+    except Exception as e:
+        first = [{'event': 'error', 'error': str(e), 'status': 'error'}]
+        events = iter(())
+    
+    def generate():
+        try:
+            for event in itertools.chain(first, events):
+                if compact and event['event'] == 'analysis':
+                    event = {'event': 'analysis', **compact_response(event, article_text)}
+                    yield dumps(event).decode('utf-8') + '\n'
+                else:
+                    yield json.dumps(event) + '\n'
+        except Exception as e:
+            yield json.dumps({'event': 'error', 'error': str(e), 'status': 'error'}) + '\n'
+    
+    if compact:
+        return stream_response(stream_with_context(generate()), 'application/x-ndjson')
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    data = request.get_json(silent=True)
+    articles = data.get('articles') if isinstance(data, dict) else None
+    
+    if not isinstance(articles, list) or not articles:
+        return jsonify({
+            'error': 'No articles provided',
+            'status': 'error'
+        }), 400
+    
+    if len(articles) > Config.BATCH_MAX_ARTICLES:
+        return jsonify({
+            'error': f'At most {Config.BATCH_MAX_ARTICLES} articles per batch',
+            'status': 'error'
+        }), 413
+    
+    texts = [a.get('article_text') if isinstance(a, dict) else a for a in articles]
+    if not all(isinstance(text, str) for text in texts):
+        return jsonify({
+            'error': 'Every article must be a string or have an article_text field',
+            'status': 'error'
+        }), 400
+    
+    try:
+        batch_size = max(int(data.get('batch_size', Config.BATCH_SIZE)), 1)
+    except (TypeError, ValueError):
+        return jsonify({
+            'error': 'batch_size must be an integer',
+            'status': 'error'
+        }), 400
+    include_related = bool(data.get('related_articles', False))
+    include_compare = bool(data.get('compare', False))
+    
+    # Always in this process: forking a worker with live threads can copy a held lock
+    results = pipeline.run_batch(texts, batch_size, 1, include_related, include_compare)
+    try:
+        # The first chunk is analyzed before the response starts, so an overloaded worker can still answer 503
+        first = list(itertools.islice(results, 1))
+        error = None
+    except Overloaded:
+        raise
+    except Exception as e:
+        first, error = [], e
+    
+    def generate():
+        if error is not None:
+            yield json.dumps({'error': str(error), 'status': 'error'}) + '\n'
+            return
+        try:
+            for index, result in enumerate(itertools.chain(first, results)):
+                yield json.dumps({'index': index, **result}) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': str(e), 'status': 'error'}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -75,6 +276,28 @@ def health_check():
         'environment': os.getenv('RAILWAY_ENVIRONMENT', 'development')
     })
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    stats = {
+        'analysis': pipeline.analysis_cache.stats(),
+        'related': pipeline.related_cache.stats(),
+        'gpt': pipeline.gpt_cache.stats()
+    }
+    for analyzer in (pipeline.analyzer.bias_analyzer, pipeline.analyzer.political_analyzer):
+        memo = analyzer.sentence_memo.cache
+        if memo is not None:
+            stats[memo.namespace] = memo.stats()
+    return jsonify(stats)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not Config.METRICS_ENABLED:
+        return jsonify({
+            'error': 'Metrics are disabled',
+            'status': 'error'
+        }), 404
+    return Response(metrics.expose(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/', methods=['GET'])
 def root():
     return jsonify({
@@ -82,7 +305,13 @@ def root():
         'status': 'running',
         'endpoints': {
             'analyze': '/api/analyze',
-            'health': '/api/health'
+            'analyze_stream': '/api/analyze/stream',
+            'analyze_batch': '/api/analyze/batch',
+            'jobs': '/api/jobs/<job_id>',
+            'job_events': '/api/jobs/<job_id>/events',
+            'health': '/api/health',
+            'cache_stats': '/api/cache/stats',
+            'metrics': '/api/metrics'
         }
     })
 
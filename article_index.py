@@ -0,0 +1,116 @@
+import json
+import os
+import time
+from get_content_using_url import is_public_url
+from sqlite_local import LocalConnection
+
+# Extracted page text beyond this adds little to matching and only grows the index
+MAX_BODY_CHARS = 20000
+
+# Keywords to combine into the query; results must contain at least two of them
+QUERY_KEYWORDS = 5
+
+# BM25 weight of a match in the title, description and body
+COLUMN_WEIGHTS = (4.0, 2.0, 1.0)
+
+class ArticleIndex:
+    """On-disk BM25 index of every article the service has fetched or seen from NewsAPI.
+
+    Backed by an SQLite FTS5 inverted index over title, description and
+    extracted body, shared by every worker process on the machine. Stored
+    articles keep NewsAPI's shape so they can be returned as related articles.
+    Their URLs are fetched later, so only http(s) URLs on public hosts are kept.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = LocalConnection(path)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS articles ('
+                'id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, '
+                'article TEXT NOT NULL, added_at REAL)'
+            )
+            conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5('
+                "title, description, body, tokenize='porter unicode61')"
+            )
+
+    def add(self, article, body=None):
+        """Insert or update an article; a missing body keeps the one already indexed"""
+        url = article.get('url')
+        if not url or not is_public_url(url, resolve=False):
+            return
+        with self._connection() as conn:
+            self._upsert(conn, url, article, body)
+
+    def add_many(self, articles, bodies=None):
+        bodies = bodies or [None] * len(articles)
+        with self._connection() as conn:
+            for article, body in zip(articles, bodies):
+                url = article.get('url')
+                if url and is_public_url(url, resolve=False):
+                    self._upsert(conn, url, article, body)
+
+    def _upsert(self, conn, url, article, body):
+        title = article.get('title') or ''
+        description = article.get('description') or ''
+        row = conn.execute('SELECT id FROM articles WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            cursor = conn.execute(
+                'INSERT INTO articles (url, article, added_at) VALUES (?, ?, ?)',
+                (url, json.dumps(article), time.time())
+            )
+            conn.execute(
+                'INSERT INTO articles_fts (rowid, title, description, body) VALUES (?, ?, ?, ?)',
+                (cursor.lastrowid, title, description, (body or '')[:MAX_BODY_CHARS])
+            )
+            return
+
+        article_id = row[0]
+        conn.execute('UPDATE articles SET article = ? WHERE id = ?', (json.dumps(article), article_id))
+        if body is None:
+            conn.execute(
+                'UPDATE articles_fts SET title = ?, description = ? WHERE rowid = ?',
+                (title, description, article_id)
+            )
+        else:
+            conn.execute(
+                'UPDATE articles_fts SET title = ?, description = ?, body = ? WHERE rowid = ?',
+                (title, description, body[:MAX_BODY_CHARS], article_id)
+            )
+
+    def search(self, keywords, limit=10):
+        """Best BM25 matches containing at least two of the top keywords (or the only one)"""
+        query = match_query(keywords[:QUERY_KEYWORDS])
+        if not query:
+            return []
+        # Rank inside the FTS table first so only the top rows are joined
+        rows = self._connection().execute(
+            'SELECT a.article FROM ('
+            'SELECT rowid, bm25(articles_fts, ?, ?, ?) AS score FROM articles_fts '
+            'WHERE articles_fts MATCH ? ORDER BY score LIMIT ?'
+            ') f JOIN articles a ON a.id = f.rowid ORDER BY f.score',
+            (*COLUMN_WEIGHTS, query, limit)
+        ).fetchall()
+        return [json.loads(article) for (article,) in rows]
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+def match_query(keywords):
+    """FTS5 query matching documents that contain any two of the keywords as phrases"""
+    phrases = []
+    for keyword in keywords:
+        keyword = keyword.strip()
+        if keyword:
+            phrases.append('"' + keyword.replace('"', '""') + '"')
+    if len(phrases) < 2:
+        return ' OR '.join(phrases)
+    return ' OR '.join(
+        f'({first} AND {second})'
+        for i, first in enumerate(phrases)
+        for second in phrases[i + 1:]
+    )
@@ -0,0 +1,154 @@
+"""A burst of concurrent /api/analyze requests against real gunicorn, per deployment setup.
+
+Each setup starts gunicorn with gunicorn.conf.py and the stubbed app
+(benchmarks/stub_wsgi.py), fires every request at once from --concurrency
+client threads and reports completed throughput, latency percentiles, how
+many requests were turned away with 503 (and how fast) and how many the
+client gave up on. With --retry, clients retry a 503 after its Retry-After,
+so latency is to the final answer:
+
+    python -m benchmarks.bench_burst --requests 64 --concurrency 32
+    python -m benchmarks.bench_burst --retry 10
+    python -m benchmarks.bench_burst --setups admission --workers 2
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+from benchmarks.corpus import load_corpus
+from benchmarks.stubs import PageServer
+
+# Environment for each setup; unset variables fall back to config.py
+SETUPS = {
+    # gunicorn's defaults: one sync worker, no admission control
+    'baseline': {'GUNICORN_WORKER_CLASS': 'sync', 'WEB_CONCURRENCY': '1', 'NLP_CONCURRENCY': '0'},
+    # The shipped gunicorn.conf.py and config.py defaults
+    'admission': {}
+}
+
+def percentiles(latencies):
+    # benchmarks.run is not imported: it turns admission control off for its own runs
+    latencies = np.asarray(latencies) * 1000
+    return {f'p{q}_ms': round(float(np.percentile(latencies, q)), 1) for q in (50, 95, 99)}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(setup_env, args, pages):
+    port = free_port()
+    data_dir = tempfile.mkdtemp()
+    env = dict(os.environ)
+    env.setdefault('OPENAI_API_KEY', 'benchmark')
+    env.setdefault('NEWS_API_KEY', 'benchmark')
+    env.update({
+        'PORT': str(port),
+        'BENCH_PAGE_URL': pages.url,
+        # The stand-in pages are served from 127.0.0.1
+        'FETCH_ALLOW_PRIVATE_HOSTS': 'True',
+        'BENCH_NEWSAPI_LATENCY': str(args.newsapi_latency),
+        'BENCH_GPT_LATENCY': str(args.gpt_latency),
+        'NEWSAPI_REQUESTS_PER_MINUTE': '1000000',
+        'NEWSAPI_BURST': '1000',
+        'OPENAI_REQUESTS_PER_MINUTE': '1000000',
+        'OPENAI_BURST': '1000',
+        'SENTENCE_CACHE_MAX_ENTRIES': '0',
+        'ARTICLE_INDEX_PATH': os.path.join(data_dir, 'article_index.db'),
+        'JOB_QUEUE_PATH': os.path.join(data_dir, 'jobs.db')
+    })
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    env.update(setup_env)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'benchmarks.stub_wsgi:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'{url}/api/health', timeout=1)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+def burst(url, texts, args):
+    def post(text):
+        start = time.perf_counter()
+        retries = 0
+        while True:
+            try:
+                response = requests.post(f'{url}/api/analyze', json={'article_text': text},
+                                         timeout=args.client_timeout)
+            except requests.Timeout:
+                return 'timeout', time.perf_counter() - start, retries
+            if response.status_code != 503 or retries >= args.retry:
+                return response.status_code, time.perf_counter() - start, retries
+            retries += 1
+            time.sleep(float(response.headers.get('Retry-After', 1)))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(post, texts))
+    wall_time = time.perf_counter() - start
+
+    ok = [elapsed for status, elapsed, _ in outcomes if status == 200]
+    rejected = [elapsed for status, elapsed, _ in outcomes if status == 503]
+    result = {
+        'requests': len(texts),
+        'ok': len(ok),
+        'rejected_503': len(rejected),
+        'client_timeouts': sum(1 for status, _, _ in outcomes if status == 'timeout'),
+        'other_errors': sum(1 for status, _, _ in outcomes if status not in (200, 503, 'timeout')),
+        'retries': sum(retries for _, _, retries in outcomes),
+        'wall_time_s': round(wall_time, 2),
+        'completed_per_s': round(len(ok) / wall_time, 2)
+    }
+    if ok:
+        result['latency'] = percentiles(ok)
+    if rejected:
+        result['rejected_latency'] = percentiles(rejected)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Burst load test of the gunicorn deployment')
+    parser.add_argument('--setups', nargs='+', choices=list(SETUPS), default=list(SETUPS))
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, help='Override WEB_CONCURRENCY for the admission setup')
+    parser.add_argument('--client-timeout', type=float, default=30)
+    parser.add_argument('--retry', type=int, default=0, help='Times a client retries a 503')
+    parser.add_argument('--newsapi-latency', type=float, default=0.2)
+    parser.add_argument('--page-latency', type=float, default=0.1)
+    parser.add_argument('--gpt-latency', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.requests // 3 + 1)
+    # Distinct texts, so nothing is shared between requests
+    texts = [f"{text}\n\nBurst request {i}." for i, (_, text) in
+             zip(range(args.requests), corpus * (args.requests // len(corpus) + 1))]
+
+    pages = PageServer(latency=args.page_latency)
+    results = {}
+    for name in args.setups:
+        process, url = start_server(SETUPS[name], args, pages)
+        try:
+            results[name] = burst(url, texts, args)
+        finally:
+            process.terminate()
+            process.wait()
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
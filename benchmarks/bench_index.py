@@ -0,0 +1,82 @@
+"""Related-article lookup latency of the local article index at scale.
+
+Fills a fresh index with synthetic articles (Zipf-distributed vocabulary, so
+common words match many documents) and times searches with keyword sets
+drawn the same way:
+
+    python -m benchmarks.bench_index --documents 200000 --queries 500
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from article_index import ArticleIndex
+from benchmarks.run import summarize
+
+def make_vocabulary(size, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+def make_articles(count, vocabulary, body_words, rng):
+    # Word i is drawn with probability proportional to 1 / (i + 1)
+    cum_weights = np.cumsum(1 / np.arange(1, len(vocabulary) + 1)).tolist()
+    for i in range(count):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=12 + 30 + body_words)
+        article = {
+            'source': {'id': None, 'name': 'bench'},
+            'title': ' '.join(words[:12]),
+            'description': ' '.join(words[12:42]),
+            'url': f'https://bench.example/{i}'
+        }
+        yield article, ' '.join(words[42:])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark article index lookups')
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--body-words', type=int, default=200)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--path', help='Index file to create; defaults to a temporary file')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(489)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'article_index.db')
+    index = ArticleIndex(path)
+
+    start = time.perf_counter()
+    batch = []
+    for article, body in make_articles(args.documents, vocabulary, args.body_words, rng):
+        batch.append((article, body))
+        if len(batch) == 1000:
+            index.add_many([a for a, b in batch], [b for a, b in batch])
+            batch = []
+    if batch:
+        index.add_many([a for a, b in batch], [b for a, b in batch])
+    build_time = time.perf_counter() - start
+
+    # The extractor drops stopwords, so keywords come from below the most frequent words
+    latencies, hits = [], []
+    for _ in range(args.queries):
+        keywords = rng.sample(vocabulary[100:5000], 5)
+        start = time.perf_counter()
+        results = index.search(keywords)
+        latencies.append(time.perf_counter() - start)
+        hits.append(len(results))
+
+    print(json.dumps({
+        'documents': len(index),
+        'build_time_s': round(build_time, 2),
+        'index_mb': round(os.path.getsize(path) / (1024 * 1024), 1),
+        'mean_results': round(float(np.mean(hits)), 2),
+        'search': summarize(latencies)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
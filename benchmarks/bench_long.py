@@ -0,0 +1,70 @@
+"""Peak memory and time of analyzing very long texts, chunked and (optionally) as one Doc.
+
+Each size runs in a fresh interpreter so the peak RSS belongs to that run alone.
+Texts are the fixture corpus's long article repeated with paragraph breaks:
+
+    python -m benchmarks.bench_long --sizes 200000 800000 2400000
+    python -m benchmarks.bench_long --sizes 800000 --whole
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+def measure(size, whole):
+    # In the child: analyze one text and report time and peak RSS beyond the loaded models
+    from benchmarks.corpus import load_corpus
+    from benchmarks.run import peak_rss_mb
+    from models.analysis_context import AnalysisContext
+    from models.article_analyzer import ArticleAnalyzer
+    from models.registry import registry
+
+    registry.warm_up()
+    baseline = peak_rss_mb()
+    text = load_corpus(1)[-1][1] + '\n\n'
+    text = (text * (size // len(text) + 1))[:size]
+    analyzer = ArticleAnalyzer('benchmark')
+
+    start = time.perf_counter()
+    if whole:
+        registry.nlp.max_length = max(registry.nlp.max_length, size + 1)
+        analyzer._analyze_context(AnalysisContext(text, registry.nlp, analyzer.disabled_components))
+    else:
+        analyzer.analyze_long_article(text)
+    return {
+        'chars': size,
+        'mode': 'whole' if whole else 'chunked',
+        'seconds': round(time.perf_counter() - start, 2),
+        'rss_growth_mb': round(peak_rss_mb() - baseline, 1)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark chunked analysis of long texts')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200000, 800000])
+    parser.add_argument('--whole', action='store_true', help='Also parse each text as a single Doc')
+    parser.add_argument('--child', nargs=2, metavar=('SIZE', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(int(args.child[0]), args.child[1] == 'whole')))
+        return
+
+    env = dict(os.environ)
+    env.setdefault('OPENAI_API_KEY', 'benchmark')
+    env.setdefault('NEWS_API_KEY', 'benchmark')
+    # Repeated paragraphs would otherwise be served from the sentence cache
+    env['SENTENCE_CACHE_MAX_ENTRIES'] = '0'
+    results = []
+    for size in args.sizes:
+        for mode in ['chunked'] + (['whole'] if args.whole else []):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_long', '--child', str(size), mode],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Micro-benchmark: per-sentence VADER scoring before the single-pass sentiment stage, and the current bias scoring.
+
+The current path (BiasAnalyzer.sentence_features and aggregate) scores each
+sentence once and also does the indicator matching and word counts, so it is
+timed with the sentence memo off:
+
+    python -m benchmarks.bench_sentiment [--words 5000] [--repeat 5]
+"""
+import argparse
+import time
+import numpy as np
+from nltk.tokenize import sent_tokenize
+from models.analysis_context import AnalysisContext
+from models.bias_analyzer import BiasAnalyzer
+from models.registry import registry
+from models.sentence_memo import SentenceMemo
+
+PARAGRAPH = (
+    "Proponents of strong climate policies argue that immediate action is essential. "
+    "Critics say the sweeping regulations are a terrible idea that will never work! "
+    "Experts say energy prices could rise, which is a horrible outcome for families. "
+    "The new plan is reportedly amazing, and supporters think it is wonderful. "
+)
+
+def make_article(words):
+    paragraph_words = len(PARAGRAPH.split())
+    return PARAGRAPH * max(words // paragraph_words, 1)
+
+def legacy_sentiment(sid, text, sentences):
+    # Previous behaviour: NLTK split scored once, spaCy split scored again
+    sentiments = [sid.polarity_scores(sentence) for sentence in sent_tokenize(text)]
+    averages = {
+        'compound': np.mean([s['compound'] for s in sentiments]),
+        'pos': np.mean([s['pos'] for s in sentiments]),
+        'neg': np.mean([s['neg'] for s in sentiments]),
+        'neu': np.mean([s['neu'] for s in sentiments])
+    }
+    emotional = []
+    for sent in sentences:
+        scores = sid.polarity_scores(sent.text)
+        if abs(scores['compound']) > 0.5:
+            emotional.append({'text': sent.text, 'intensity': scores['compound']})
+    return averages, emotional
+
+def single_pass_bias(analyzer, sentences):
+    return analyzer.aggregate([sent.text for sent in sentences], analyzer.sentence_features(sentences))
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--words', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    text = make_article(args.words)
+    context = AnalysisContext(text, registry.nlp, BiasAnalyzer.disabled_components)
+    sentences = context.sentences
+    analyzer = BiasAnalyzer()
+    # The article repeats one paragraph; every sentence would be a memo hit
+    analyzer.sentence_memo = SentenceMemo('bias_sentences', max_entries=0)
+
+    legacy = best_of(args.repeat, legacy_sentiment, analyzer.sid, text, sentences)
+    single = best_of(args.repeat, single_pass_bias, analyzer, sentences)
+    print(f"{len(text.split())} words, {len(sentences)} sentences")
+    print(f"legacy sentiment (two splits, two VADER passes): {legacy * 1000:8.1f} ms")
+    print(f"sentence_features + aggregate (all bias scores):  {single * 1000:8.1f} ms")
+    print(f"speedup: {legacy / single:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Show the change in every benchmark metric between two result files.
+
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+import argparse
+import json
+
+def flatten(results, prefix=''):
+    metrics = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diff two benchmark result files')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    args = parser.parse_args(argv)
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    old_metrics = flatten({k: v for k, v in old.items() if k != 'settings'})
+    new_metrics = flatten({k: v for k, v in new.items() if k != 'settings'})
+    for name in sorted(old_metrics.keys() & new_metrics.keys()):
+        before, after = old_metrics[name], new_metrics[name]
+        change = f'{(after - before) / before * 100:+.1f}%' if before else 'n/a'
+        print(f"{name:55} {before:>12} {after:>12} {change:>9}")
+
+if __name__ == '__main__':
+    main()
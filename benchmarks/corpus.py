@@ -0,0 +1,41 @@
+"""Deterministic fixture corpus of news-like articles of varying length."""
+import random
+
+SENTENCES = [
+    "Lawmakers met on Tuesday to debate the new budget proposal.",
+    "Proponents of strong climate policies argue that immediate action is essential.",
+    "Critics say the sweeping regulations are a terrible idea that will never work!",
+    "Experts say energy prices could rise, which is a horrible outcome for families.",
+    "The senator reportedly supports tax cuts and a smaller federal government.",
+    "Advocates for universal healthcare rallied outside the capitol.",
+    "Officials confirmed that border security funding was part of the deal.",
+    "Some residents believe the plan is amazing, while others think it is radical.",
+    "The report, released by an independent agency, found no evidence of fraud.",
+    "Studies show that wealth inequality has grown over the last decade.",
+    "Analysts expect the free market to respond within weeks.",
+    "Perhaps the most controversial element is the proposed carbon tax.",
+    "Every district will receive additional funding for public schools.",
+    "The governor said the decision was made after consulting local leaders.",
+    "Activists called the measure a step toward social justice and racial equity.",
+]
+
+# Article lengths in words: short wire items, typical stories and long features
+LENGTHS = {'short': 150, 'medium': 800, 'long': 5000}
+
+def make_article(words, rng):
+    parts = []
+    count = 0
+    while count < words:
+        paragraph = ' '.join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 6)))
+        parts.append(paragraph)
+        count += len(paragraph.split())
+    return '\n\n'.join(parts)
+
+def load_corpus(per_length=10, seed=489):
+    """Return [(length_name, text)], the same for every run with the same arguments"""
+    rng = random.Random(seed)
+    return [
+        (name, make_article(words, rng))
+        for name, words in LENGTHS.items()
+        for _ in range(per_length)
+    ]
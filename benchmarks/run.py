@@ -0,0 +1,189 @@
+"""Offline benchmarks for the analyzers and the /api/analyze endpoint.
+
+NewsAPI, OpenAI and the scraped pages are replaced by local stand-ins, so no
+quota is spent. Results are written as JSON to diff between commits:
+
+    python -m benchmarks.run --concurrency 8 --requests 200
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+# The app refuses to start without keys; the stubs never use them
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+os.environ.setdefault('NEWS_API_KEY', 'benchmark')
+# The stand-ins have no quota; don't let the production rate limits pace the load
+os.environ.setdefault('NEWSAPI_REQUESTS_PER_MINUTE', '1000000')
+os.environ.setdefault('NEWSAPI_BURST', '1000')
+os.environ.setdefault('OPENAI_REQUESTS_PER_MINUTE', '1000000')
+os.environ.setdefault('OPENAI_BURST', '1000')
+# Measure the pipeline itself; benchmarks/bench_burst.py covers admission control
+os.environ.setdefault('NLP_CONCURRENCY', '0')
+# The fixture corpus repeats sentences; keep component timings comparable with runs before the memo
+os.environ.setdefault('SENTENCE_CACHE_MAX_ENTRIES', '0')
+# The stand-in pages are served from 127.0.0.1
+os.environ.setdefault('FETCH_ALLOW_PRIVATE_HOSTS', 'True')
+
+from benchmarks.corpus import load_corpus
+from benchmarks.stubs import PageServer, StubNewsApiClient, StubOpenAI
+
+def summarize(latencies, wall_time=None):
+    latencies = np.asarray(latencies)
+    wall_time = wall_time if wall_time is not None else float(latencies.sum())
+    return {
+        'count': int(len(latencies)),
+        'wall_time_s': round(wall_time, 4),
+        'articles_per_s': round(len(latencies) / wall_time, 2) if wall_time else None,
+        'mean_ms': round(float(latencies.mean()) * 1000, 3),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 3),
+    }
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def bench_components(corpus):
+    from models.analysis_context import AnalysisContext
+    from models.article_analyzer import ArticleAnalyzer, KeywordExtractor
+    from models.bias_analyzer import BiasAnalyzer, PoliticalAnalyzer
+    from models.registry import registry
+
+    registry.warm_up()
+    bias, political, keywords = BiasAnalyzer(), PoliticalAnalyzer(), KeywordExtractor()
+    stages = {'spacy_parse': [], 'bias_analyze': [], 'political_analyze': [], 'keyword_extract': []}
+    by_length = {}
+
+    for length, text in corpus:
+        context = AnalysisContext(text, registry.nlp, ArticleAnalyzer.disabled_components)
+        _, parse_time = timed(lambda: context.sentences)
+        _, bias_time = timed(bias.analyze, text, context)
+        _, political_time = timed(political.analyze_political_leaning, text, context)
+        _, keyword_time = timed(keywords.extract_keywords, text, context)
+
+        stages['spacy_parse'].append(parse_time)
+        stages['bias_analyze'].append(bias_time)
+        stages['political_analyze'].append(political_time)
+        stages['keyword_extract'].append(keyword_time)
+        by_length.setdefault(length, []).append(parse_time + bias_time + political_time + keyword_time)
+
+    return {
+        'stages': {name: summarize(latencies) for name, latencies in stages.items()},
+        'by_length': {name: summarize(latencies) for name, latencies in by_length.items()},
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def bench_endpoint(corpus, args):
+    from werkzeug.serving import make_server
+    import app as app_module
+    from cache import ResultCache
+    from article_index import ArticleIndex
+
+    pages = PageServer(latency=args.page_latency)
+    app_module.analyzer.newsapi = StubNewsApiClient(pages.url, latency=args.newsapi_latency)
+    app_module.gpt.client = StubOpenAI(latency=args.gpt_latency)
+    if not args.with_cache:
+        # Zero-size caches evict every entry immediately, so every request does the full work
+        for name in ('analysis_cache', 'related_cache', 'gpt_cache'):
+            setattr(app_module.pipeline, name, ResultCache(name, max_entries=0))
+        app_module.pipeline.article_index = None
+    elif app_module.pipeline.article_index is not None:
+        # Start from an empty index so runs are comparable
+        app_module.pipeline.article_index = ArticleIndex(os.path.join(tempfile.mkdtemp(), 'article_index.db'))
+
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/analyze"
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount('http://', adapter)
+
+    def post(index):
+        _, text = corpus[index % len(corpus)]
+        start = time.perf_counter()
+        response = session.post(url, json={'article_text': text}, timeout=120)
+        return time.perf_counter() - start, response.status_code
+
+    # One warm-up request so model loading is not counted
+    post(0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(post, range(args.requests)))
+    wall_time = time.perf_counter() - start
+
+    server.shutdown()
+    pages.close()
+
+    latencies = [latency for latency, status in results]
+    errors = sum(1 for latency, status in results if status != 200)
+    return {
+        'concurrency': args.concurrency,
+        'errors': errors,
+        **summarize(latencies, wall_time),
+        'upstream_calls': {
+            'newsapi': app_module.analyzer.newsapi.calls,
+            'openai': app_module.gpt.client.calls
+        },
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite')
+    parser.add_argument('--per-length', type=int, default=10, help='Articles per length bucket')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--newsapi-latency', type=float, default=0.2)
+    parser.add_argument('--page-latency', type=float, default=0.1)
+    parser.add_argument('--gpt-latency', type=float, default=1.0)
+    parser.add_argument('--with-cache', action='store_true', help='Leave the result caches enabled')
+    parser.add_argument('--skip-endpoint', action='store_true')
+    parser.add_argument('--output', help='Defaults to benchmarks/results/<commit>.json')
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.per_length)
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'settings': vars(args),
+        'components': bench_components(corpus)
+    }
+    if not args.skip_endpoint:
+        results['endpoint'] = bench_endpoint(corpus, args)
+
+    output = args.output or os.path.join('benchmarks', 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Saved to {output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Measure how long a worker takes to boot, with and without preloading the models.
+
+Each measurement runs in a fresh interpreter, the way gunicorn starts a worker:
+
+- ``import_app_s`` / ``import_wsgi_s``: wall time of ``import app`` (models
+  deferred) and ``import wsgi`` (PRELOAD_MODELS loads them before serving)
+- ``boot_to_healthy_s``: process start until ``/api/health`` first answers 200
+- ``slowest_imports``: cumulative ``python -X importtime`` of the heaviest
+  top-level packages pulled in by ``import app``
+
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --server gunicorn
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import numpy as np
+import requests
+from benchmarks.run import git_commit
+
+def child_env(preload):
+    env = dict(os.environ)
+    # The app refuses to start without keys; nothing here calls the APIs
+    env.setdefault('OPENAI_API_KEY', 'benchmark')
+    env.setdefault('NEWS_API_KEY', 'benchmark')
+    env['PRELOAD_MODELS'] = 'true' if preload else 'false'
+    return env
+
+def time_import(module, preload):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f'import {module}'], env=child_env(preload),
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def slowest_imports(module, top):
+    """Top-level packages by cumulative import time, in milliseconds"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            env=child_env(False), check=True, capture_output=True, text=True)
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        # A package's own line covers everything it pulled in the first time it was imported
+        if '.' not in name and name != module:
+            packages[name] = max(packages.get(name, 0), int(cumulative) / 1000)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: round(ms, 1) for package, ms in ranked}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def boot_to_healthy(server, preload, timeout=120):
+    port = free_port()
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1']
+        if preload:
+            command.append('--preload')
+        command.append('wsgi:app')
+    else:
+        command = [sys.executable, '-c',
+                   f"from wsgi import app; app.run(host='127.0.0.1', port={port})"]
+
+    url = f'http://127.0.0.1:{port}/api/health'
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=child_env(preload),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f'{server} exited with code {process.returncode}')
+            try:
+                if requests.get(url, timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f'{server} was not healthy after {timeout}s')
+    finally:
+        process.terminate()
+        process.wait()
+
+def median(func, repeat, *args):
+    return round(float(np.median([func(*args) for _ in range(repeat)])), 4)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark worker startup time')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the median is kept')
+    parser.add_argument('--server', choices=['werkzeug', 'gunicorn'], default='werkzeug')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    parser.add_argument('--output', help='Defaults to benchmarks/results/startup-<commit>.json')
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'settings': vars(args),
+        'import_app_s': median(time_import, args.repeat, 'app', False),
+        'import_wsgi_s': median(time_import, args.repeat, 'wsgi', True),
+        'boot_to_healthy_s': {
+            'lazy': median(boot_to_healthy, args.repeat, args.server, False),
+            'preload': median(boot_to_healthy, args.repeat, args.server, True)
+        },
+        'slowest_imports': slowest_imports('app', args.top)
+    }
+
+    output = args.output or os.path.join('benchmarks', 'results', f'startup-{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Saved to {output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+"""wsgi.py with NewsAPI and OpenAI replaced by the local stand-ins, for benchmarks that run gunicorn.
+
+    BENCH_PAGE_URL=http://127.0.0.1:<port> FETCH_ALLOW_PRIVATE_HOSTS=True gunicorn -c gunicorn.conf.py benchmarks.stub_wsgi:app
+"""
+import os
+from wsgi import app
+import app as app_module
+from cache import ResultCache
+from benchmarks.stubs import StubNewsApiClient, StubOpenAI
+
+app_module.analyzer.newsapi = StubNewsApiClient(
+    os.environ['BENCH_PAGE_URL'], latency=float(os.getenv('BENCH_NEWSAPI_LATENCY', 0.2))
+)
+app_module.gpt.client = StubOpenAI(latency=float(os.getenv('BENCH_GPT_LATENCY', 1.0)))
+
+# Every request does the full work
+for name in ('analysis_cache', 'related_cache', 'gpt_cache'):
+    setattr(app_module.pipeline, name, ResultCache(name, max_entries=0))
+app_module.pipeline.article_index = None
@@ -0,0 +1,98 @@
+"""Local stand-ins for NewsAPI, OpenAI and the scraped pages, with configurable latency."""
+import http.server
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+PAGE_TEMPLATE = """<html><head><title>{title}</title><script>var tracking = true;</script></head>
+<body><nav>Home | World | Politics</nav><article><h1>{title}</h1>{body}</article>
+<footer>Copyright News Corp</footer></body></html>"""
+
+class PageServer:
+    """Serves generated article pages at http://127.0.0.1:<port>/article/<n>"""
+
+    def __init__(self, latency=0.0, paragraphs=20):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.latency)
+                body = ''.join(
+                    f"<p>Paragraph {i} of {self.path}: officials said the measure would pass.</p>"
+                    for i in range(server.paragraphs)
+                )
+                page = PAGE_TEMPLATE.format(title=self.path, body=body).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, *args):
+                pass
+
+        self.latency = latency
+        self.paragraphs = paragraphs
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+# Distinct headlines, so the stub's results are not collapsed as near-duplicates
+ANGLES = [
+    'What critics say about',
+    'Supporters defend',
+    'Explainer:',
+    'Local officials react to',
+    'Markets weigh in on',
+    'Opinion: rethinking',
+]
+
+class StubNewsApiClient:
+    """Answers get_everything with articles that mention the queried keywords"""
+
+    def __init__(self, page_url, latency=0.0, n_articles=5):
+        self.page_url = page_url
+        self.latency = latency
+        self.n_articles = n_articles
+        self.calls = 0
+
+    def get_everything(self, q, language=None, sort_by=None, page_size=10):
+        self.calls += 1
+        time.sleep(self.latency)
+        keywords = re.findall(r'"([^"]+)"', q)
+        return {'status': 'ok', 'articles': [
+            {
+                'source': {'id': None, 'name': f'Source {i}'},
+                'author': None,
+                'title': f"{ANGLES[i % len(ANGLES)]} {' '.join(keywords)}",
+                'description': f"Source {i} on {', '.join(keywords)}: {ANGLES[(i + 3) % len(ANGLES)].lower()} the story",
+                'url': f"{self.page_url}/article/{i}?q={'+'.join(keywords)}",
+                'urlToImage': None,
+                'publishedAt': '2024-12-01T00:00:00Z',
+                'content': ''
+            }
+            for i in range(min(self.n_articles, page_size))
+        ]}
+
+class StubOpenAI:
+    """Mimics client.chat.completions.create, streaming or not"""
+
+    def __init__(self, latency=0.0, answer="The current article and other articles agree on the main facts."):
+        self.latency = latency
+        self.answer = answer
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if stream:
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + ' '))])
+                for word in self.answer.split()
+            ])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer))])
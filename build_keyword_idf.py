@@ -0,0 +1,35 @@
+"""Build the corpus IDF table used for keyword extraction.
+
+Input is NDJSON with one {"article_text": ...} object (or JSON string) per line,
+in the same format analyze_batch.py reads:
+
+    python build_keyword_idf.py news_corpus.ndjson -o models/data/keyword_idf.npy
+"""
+import argparse
+import json
+import os
+from config import Config
+from models.keyword_idf import N_BUCKETS, build_idf_table, save_idf_table
+
+def iter_texts(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                item = json.loads(line)
+                yield item['article_text'] if isinstance(item, dict) else item
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a hashed IDF table from a news corpus')
+    parser.add_argument('corpus', help='NDJSON corpus file')
+    parser.add_argument('-o', '--output', default=Config.KEYWORD_IDF_PATH)
+    parser.add_argument('--buckets', type=int, default=N_BUCKETS, help='Number of hash buckets')
+    args = parser.parse_args(argv)
+
+    idf = build_idf_table(iter_texts(args.corpus), args.buckets)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    save_idf_table(args.output, idf)
+    print(f"Wrote {len(idf)} IDF buckets to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from metrics import cache_requests
+from sqlite_local import LocalConnection
+
+def normalize_text(text):
+    """The text without the differences that do not change the analysis"""
+    return unicodedata.normalize('NFC', text or '').replace('\r\n', '\n').strip()
+
+def content_key(*parts):
+    """Hash text after normalizing the differences that do not change the analysis"""
+    digest = hashlib.sha256()
+    for part in parts:
+        text = normalize_text(part)
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class DiskTier:
+    """SQLite store shared by every worker process on the machine.
+
+    Expired rows are deleted when read, at startup and every ``purge_interval``
+    seconds of writes. The same purge keeps at most ``max_entries`` rows per
+    namespace, dropping the least recently written, so rows without a TTL
+    can't grow the file forever either.
+    """
+
+    def __init__(self, path, max_entries=100000, purge_interval=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._connection = LocalConnection(path)
+        with self._connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'namespace TEXT, key TEXT, value TEXT, expires_at REAL, '
+                'PRIMARY KEY (namespace, key))'
+            )
+        self.purge()
+
+    def get(self, namespace, key):
+        entry = self.get_entry(namespace, key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, namespace, key):
+        """(value, expires_at) of a live row, expires_at being wall-clock time or None"""
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?',
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            with self._connection() as conn:
+                conn.execute(
+                    'DELETE FROM cache WHERE namespace = ? AND key = ? AND expires_at < ?',
+                    (namespace, key, time.time())
+                )
+            return None
+        return json.loads(value), expires_at
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) '
+                'VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), expires_at)
+            )
+        if time.monotonic() - self._last_purge > self.purge_interval:
+            self.purge()
+
+    def purge(self):
+        """Delete every expired row, then all but the newest max_entries rows of each namespace"""
+        self._last_purge = time.monotonic()
+        with self._connection() as conn:
+            conn.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),))
+            namespaces = [row[0] for row in conn.execute('SELECT DISTINCT namespace FROM cache')]
+            for namespace in namespaces:
+                # INSERT OR REPLACE gives a rewritten row a new rowid, so rowid order is write order
+                conn.execute(
+                    'DELETE FROM cache WHERE namespace = ? AND rowid <= ('
+                    'SELECT rowid FROM cache WHERE namespace = ? ORDER BY rowid DESC LIMIT 1 OFFSET ?)',
+                    (namespace, namespace, self.max_entries)
+                )
+
+class ResultCache:
+    """Bounded in-memory LRU with a TTL, optionally backed by a DiskTier"""
+
+    def __init__(self, namespace, max_entries=1024, ttl=None, disk=None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = disk
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    cache_requests.inc(cache=self.namespace, result='hit')
+                    return value
+                del self._entries[key]
+
+        if self.disk is not None:
+            try:
+                entry = self.disk.get_entry(self.namespace, key)
+            except sqlite3.Error as e:
+                print(f"Error reading {self.namespace} cache: {e}")
+                entry = None
+            if entry is not None:
+                value, expires_at = entry
+                # Only for what is left of the row's TTL, not a fresh one
+                self._remember(key, value, self.ttl if expires_at is None else max(expires_at - time.time(), 0.001))
+                with self._lock:
+                    self.disk_hits += 1
+                cache_requests.inc(cache=self.namespace, result='disk_hit')
+                return value
+
+        with self._lock:
+            self.misses += 1
+        cache_requests.inc(cache=self.namespace, result='miss')
+        return None
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(self.namespace, key, value, self.ttl)
+            except sqlite3.Error as e:
+                print(f"Error writing {self.namespace} cache: {e}")
+
+    def _remember(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl
+            }
@@ -11,3 +11,100 @@ class Config:
     HOST = '0.0.0.0'
     ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', '*').split(',')
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+    # Corpus IDF table built by build_keyword_idf.py; without it keywords fall back to per-article TF-IDF
+    KEYWORD_IDF_PATH = os.getenv('KEYWORD_IDF_PATH', 'models/data/keyword_idf.npy')
+
+    # Startup: PRELOAD_MODELS loads the models in wsgi.py before serving (otherwise on first
+    # request); NLTK_DOWNLOAD fetches missing NLTK data at boot, which needs network
+    PRELOAD_MODELS = os.getenv('PRELOAD_MODELS', 'True').lower() == 'true'
+    NLTK_DOWNLOAD = os.getenv('NLTK_DOWNLOAD', 'False').lower() == 'true'
+
+    # Result caching; CACHE_PATH enables a SQLite tier shared across workers
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    CACHE_PATH = os.getenv('CACHE_PATH')
+    # Rows kept per cache in the SQLite tier; the least recently written go first
+    CACHE_DISK_MAX_ENTRIES = int(os.getenv('CACHE_DISK_MAX_ENTRIES', 100000))
+    ANALYSIS_CACHE_TTL = int(os.getenv('ANALYSIS_CACHE_TTL', 0))
+    RELATED_CACHE_TTL = int(os.getenv('RELATED_CACHE_TTL', 600))
+    GPT_CACHE_TTL = int(os.getenv('GPT_CACHE_TTL', 6 * 3600))
+    # Per-sentence analyzer features, so an edited article only rescores its new sentences; 0 disables
+    SENTENCE_CACHE_MAX_ENTRIES = int(os.getenv('SENTENCE_CACHE_MAX_ENTRIES', 20000))
+
+    # Compact (?format=compact) responses smaller than this are sent uncompressed
+    COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+
+    # Local BM25 index of seen articles, searched before NewsAPI; empty path disables it
+    ARTICLE_INDEX_PATH = os.getenv('ARTICLE_INDEX_PATH', 'data/article_index.db')
+    RELATED_INDEX_MIN_RESULTS = int(os.getenv('RELATED_INDEX_MIN_RESULTS', 3))
+
+    # Concurrent analyze pipeline: thread pool size and per-stage budgets in seconds
+    PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 8))
+    RELATED_TIMEOUT = float(os.getenv('RELATED_TIMEOUT', 5))
+    FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', 8))
+    GPT_TIMEOUT = float(os.getenv('GPT_TIMEOUT', 30))
+
+    # NLP admission control per worker process: analyses run at once (0 disables the limit),
+    # how many may queue and for how long; the rest get a 503 with Retry-After. Keep
+    # NLP_CONCURRENCY + NLP_QUEUE_DEPTH below GUNICORN_THREADS so threads stay free to answer
+    NLP_CONCURRENCY = int(os.getenv('NLP_CONCURRENCY', 2))
+    NLP_QUEUE_DEPTH = int(os.getenv('NLP_QUEUE_DEPTH', 4))
+    NLP_QUEUE_TIMEOUT = float(os.getenv('NLP_QUEUE_TIMEOUT', 10))
+
+    # gunicorn.conf.py: 0 derives workers from CPUs and memory (WORKER_MEMORY_MB each)
+    # and the worker timeout from the stage budgets above
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 0))
+    GUNICORN_WORKER_CLASS = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+    GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 8))
+    GUNICORN_TIMEOUT = int(os.getenv('GUNICORN_TIMEOUT', 0))
+    WORKER_MEMORY_MB = int(os.getenv('WORKER_MEMORY_MB', 400))
+
+    # Upstream quotas (token buckets, shared by all workers when RATE_LIMIT_STATE_PATH is set)
+    # and retries of 429/5xx responses; set the limits to your NewsAPI plan and OpenAI tier
+    NEWSAPI_REQUESTS_PER_MINUTE = float(os.getenv('NEWSAPI_REQUESTS_PER_MINUTE', 60))
+    NEWSAPI_BURST = int(os.getenv('NEWSAPI_BURST', 5))
+    OPENAI_REQUESTS_PER_MINUTE = float(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 500))
+    OPENAI_BURST = int(os.getenv('OPENAI_BURST', 20))
+    OPENAI_TOKENS_PER_MINUTE = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', 200000))
+    UPSTREAM_RETRIES = int(os.getenv('UPSTREAM_RETRIES', 2))
+    RATE_LIMIT_STATE_PATH = os.getenv('RATE_LIMIT_STATE_PATH')
+
+    # Comparison candidates: near-duplicates (MinHash similarity) are dropped, then this
+    # many related pages, preferring other sources and leanings, are fetched for GPT
+    RELATED_CANDIDATES = int(os.getenv('RELATED_CANDIDATES', 2))
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.8))
+
+    # GPT comparison: both articles together are trimmed to the input token budget
+    GPT_MODEL = os.getenv('GPT_MODEL', 'gpt-4o-mini')
+    GPT_INPUT_TOKEN_BUDGET = int(os.getenv('GPT_INPUT_TOKEN_BUDGET', 6000))
+    GPT_MAX_OUTPUT_TOKENS = int(os.getenv('GPT_MAX_OUTPUT_TOKENS', 600))
+
+    # Related article fetcher: pooled connections, timeouts in seconds, download cap
+    FETCH_POOL_SIZE = int(os.getenv('FETCH_POOL_SIZE', PIPELINE_WORKERS))
+    FETCH_CONNECT_TIMEOUT = float(os.getenv('FETCH_CONNECT_TIMEOUT', 3))
+    FETCH_READ_TIMEOUT = float(os.getenv('FETCH_READ_TIMEOUT', 5))
+    FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', 2 * 1024 * 1024))
+    # Loopback and private-network hosts are never fetched or indexed unless this is set (local benchmarks)
+    FETCH_ALLOW_PRIVATE_HOSTS = os.getenv('FETCH_ALLOW_PRIVATE_HOSTS', 'False').lower() == 'true'
+
+    # Async analyze jobs: durable SQLite queue and background threads per worker process
+    JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'data/jobs.db')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 120))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))
+
+    # Batch analysis limits
+    BATCH_MAX_ARTICLES = int(os.getenv('BATCH_MAX_ARTICLES', 500))
+    BATCH_SIZE = int(os.getenv('BATCH_SIZE', 32))
+    BATCH_NETWORK_WORKERS = int(os.getenv('BATCH_NETWORK_WORKERS', 4))
+
+    # Longer articles are parsed in chunks (each under spaCy's 1M-character max_length)
+    CHUNKED_ANALYSIS_CHARS = int(os.getenv('CHUNKED_ANALYSIS_CHARS', 100000))
+    ANALYSIS_CHUNK_CHARS = int(os.getenv('ANALYSIS_CHUNK_CHARS', 20000))
+    # Larger request bodies are rejected with 413
+    MAX_REQUEST_BYTES = int(os.getenv('MAX_REQUEST_BYTES', 16 * 1024 * 1024))
+
+    # Stage histograms and counters served at /api/metrics, and the per-request Server-Timing header
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'True').lower() == 'true'
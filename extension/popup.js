@@ -62,100 +62,126 @@ document.getElementById("analyze").addEventListener("click", async () => {
           return "Very positive";
         }
 
-        function highlightText(text, color, type) {
-          console.log("Searching for text:", text);
+        const blockSelector =
+          "p, div, li, h1, h2, h3, h4, h5, h6, blockquote, pre, td, th, dt, dd, figcaption, section, article, header, footer, main, aside";
 
+        // The page text sent for analysis, with where each text node starts in it,
+        // so the sentence offsets in the response map straight back to the DOM
+        function collectPageText() {
           const walker = document.createTreeWalker(
             document.body,
             NodeFilter.SHOW_TEXT,
             {
               acceptNode: (node) => {
+                const parent = node.parentElement;
                 if (
-                  node.parentElement.closest(
-                    "script, style, .article-highlight"
+                  !parent ||
+                  parent.closest(
+                    "script, style, noscript, .article-analysis-overlay, .highlight-legend"
                   )
                 ) {
                   return NodeFilter.FILTER_REJECT;
                 }
+                if (parent.checkVisibility && !parent.checkVisibility()) {
+                  return NodeFilter.FILTER_REJECT;
+                }
                 return NodeFilter.FILTER_ACCEPT;
               },
             }
           );
 
+          const nodes = [];
+          let text = "";
+          let lastBlock = null;
           let node;
           while ((node = walker.nextNode())) {
-            if (node.textContent.includes(text)) {
-              const parent = node.parentNode;
-              const parts = node.textContent.split(text);
-              const container = document.createElement("span");
-
-              for (let i = 0; i < parts.length; i++) {
-                // Add text before highlight
-                if (parts[i]) {
-                  container.appendChild(document.createTextNode(parts[i]));
-                }
+            // Separate blocks the way innerText does, so sentences don't run together
+            const block = node.parentElement.closest(blockSelector);
+            if (text && block !== lastBlock) text += "\n";
+            lastBlock = block;
+            nodes.push({ node, start: text.length, end: text.length + node.data.length });
+            text += node.data;
+          }
+          return { text, nodes };
+        }
 
-                // Add highlight if not the last part
-                if (i < parts.length - 1) {
-                  const highlight = document.createElement("span");
-                  highlight.className = "article-highlight";
-                  highlight.style.backgroundColor = color;
-                  highlight.style.padding = "2px";
-                  highlight.style.borderRadius = "2px";
-                  highlight.title = type;
-                  highlight.textContent = text;
-                  container.appendChild(highlight);
-                }
-              }
+        function highlightRange(page, start, end, color, type) {
+          // Find the last text node that starts before the end of the range
+          let lo = 0;
+          let hi = page.nodes.length;
+          while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (page.nodes[mid].start < end) lo = mid + 1;
+            else hi = mid;
+          }
 
-              parent.replaceChild(container, node);
-            }
+          // Right to left: splitText keeps the text before the split in the original
+          // node, so the offsets of everything still to highlight stay valid
+          for (let i = lo - 1; i >= 0 && page.nodes[i].end > start; i--) {
+            const { node, start: nodeStart, end: nodeEnd } = page.nodes[i];
+            const from = Math.max(start, nodeStart) - nodeStart;
+            const to = Math.min(end, nodeEnd) - nodeStart;
+            if (to <= from) continue;
+
+            const target = node.splitText(from);
+            target.splitText(to - from);
+
+            const highlight = document.createElement("span");
+            highlight.className = "article-highlight";
+            highlight.style.backgroundColor = color;
+            highlight.style.padding = "2px";
+            highlight.style.borderRadius = "2px";
+            highlight.title = type;
+            target.parentNode.replaceChild(highlight, target);
+            highlight.appendChild(target);
           }
         }
 
-        function addHighlights(data) {
-          const analysis = data.analysis;
-
-          // Remove existing highlights
+        function clearHighlights() {
           document.querySelectorAll(".article-highlight").forEach((el) => {
             const parent = el.parentNode;
             parent.replaceChild(document.createTextNode(el.textContent), el);
+            parent.normalize();
           });
+        }
 
-          // Highlight bias indicators
-          if (analysis.bias_indicators) {
-            analysis.bias_indicators.hedging?.forEach((text) => {
-              highlightText(text, colors.hedging, "Hedging Language");
-            });
-
-            analysis.bias_indicators.extreme_language?.forEach((text) => {
-              highlightText(text, colors.extreme, "Extreme Language");
-            });
-
-            analysis.bias_indicators.opinion_statements?.forEach((text) => {
-              highlightText(text, colors.opinion, "Opinion Statement");
-            });
+        function addHighlights(data, page) {
+          const analysis = data.analysis;
+          const indicatorTypes = [
+            ["hedging", colors.hedging, "Hedging Language"],
+            ["extreme_language", colors.extreme, "Extreme Language"],
+            ["opinion_statements", colors.opinion, "Opinion Statement"],
+            ["unsubstantiated_claims", colors.unsubstantiated, "Unsubstantiated Claim"],
+          ];
+
+          // One highlight per sentence: the first type found sets the color, the tooltip lists them all
+          const marks = new Map();
+          const mark = (index, color, type) => {
+            const existing = marks.get(index);
+            if (existing) existing.types.push(type);
+            else marks.set(index, { color, types: [type] });
+          };
+
+          indicatorTypes.forEach(([category, color, type]) => {
+            analysis.bias_indicators?.[category]?.forEach((index) =>
+              mark(index, color, type)
+            );
+          });
 
-            analysis.bias_indicators.unsubstantiated_claims?.forEach((text) => {
-              highlightText(
-                text,
-                colors.unsubstantiated,
-                "Unsubstantiated Claim"
-              );
-            });
-          }
+          analysis.emotional_language?.forEach((item) => {
+            const color =
+              item.intensity > 0
+                ? colors.emotional.positive
+                : colors.emotional.negative;
+            mark(item.sentence, color, "Emotional Language");
+          });
 
-          // Highlight emotional language
-          if (analysis.emotional_language) {
-            analysis.emotional_language.forEach((item) => {
-              const color =
-                item.intensity > 0
-                  ? colors.emotional.positive
-                  : colors.emotional.negative;
-              const type = `Emotional Language`;
-              highlightText(item.text, color, type);
+          [...marks.entries()]
+            .sort(([a], [b]) => data.sentences[b][0] - data.sentences[a][0])
+            .forEach(([index, { color, types }]) => {
+              const [start, end] = data.sentences[index];
+              highlightRange(page, start, end, color, types.join(", "));
             });
-          }
         }
 
         function createAnalysisDisplay(data) {
@@ -163,9 +189,7 @@ document.getElementById("analyze").addEventListener("click", async () => {
 
           // Remove existing elements
           document
-            .querySelectorAll(
-              ".article-highlight, .article-analysis-overlay, .highlight-legend"
-            )
+            .querySelectorAll(".article-analysis-overlay, .highlight-legend")
             .forEach((el) => el.remove());
 
           const overlay = document.createElement("div");
@@ -239,7 +263,7 @@ document.getElementById("analyze").addEventListener("click", async () => {
           
             <div style="flex: 1; overflow-y: auto; padding: 15px 0;">
               <div style="font-weight: bold; margin-bottom: 10px;">Article Comparison</div>
-              <div style="font-size: 0.9em; line-height: 1.6;">
+              <div class="article-comparison" style="font-size: 0.9em; line-height: 1.6;">
                 ${markdownToHtml(data.GPT_Compare)}
               </div>
             </div>
@@ -263,7 +287,7 @@ document.getElementById("analyze").addEventListener("click", async () => {
                       ${article.title || 'Untitled'}
                     </div>
                     <div style="color: #666; font-size: 0.75em; margin-bottom: 5px;">
-                      ${article.source?.name || 'Unknown Source'} - ${new Date(article.publishedAt).toLocaleDateString()}
+                      ${article.source || 'Unknown Source'} - ${new Date(article.publishedAt).toLocaleDateString()}
                     </div>
                     <a href="${article.url}" target="_blank" style="
                       display: inline-block;
@@ -336,22 +360,62 @@ document.getElementById("analyze").addEventListener("click", async () => {
         }
 
         try {
+          // Collect the text without our own highlights and overlays in it
+          clearHighlights();
+          document
+            .querySelectorAll(".article-analysis-overlay, .highlight-legend")
+            .forEach((el) => el.remove());
+          const page = collectPageText();
+
           const response = await fetch(
-            "https://cs489-newsperspective-backend-production.up.railway.app/api/analyze",
+            "https://cs489-newsperspective-backend-production.up.railway.app/api/analyze/stream?format=compact",
             {
               method: "POST",
               headers: { "Content-Type": "application/json" },
-              body: JSON.stringify({ article_text: document.body.innerText }),
+              body: JSON.stringify({ article_text: page.text }),
             }
           );
 
-          const data = await response.json();
-          if (!data || !data.analysis) {
-            throw new Error("Invalid API response format");
+          if (!response.ok || !response.body) {
+            throw new Error(`Request failed with status ${response.status}`);
           }
 
-          const displayAdded = createAnalysisDisplay(data);
-          addHighlights(data);
+          // NDJSON events: the analysis first, then the GPT comparison as it is written
+          let displayAdded = false;
+          let comparison = "";
+
+          const handleEvent = (event) => {
+            if (event.event === "analysis") {
+              if (!event.analysis) {
+                throw new Error("Invalid API response format");
+              }
+              displayAdded = createAnalysisDisplay(event);
+              addHighlights(event, page);
+            } else if (event.event === "gpt_delta") {
+              comparison += event.text;
+              const comparisonEl = document.querySelector(
+                ".article-analysis-overlay .article-comparison"
+              );
+              if (comparisonEl) comparisonEl.innerHTML = markdownToHtml(comparison);
+            } else if (event.event === "error") {
+              throw new Error(event.error);
+            }
+          };
+
+          const reader = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer = "";
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split("\n");
+            buffer = lines.pop();
+            lines
+              .filter((line) => line.trim())
+              .forEach((line) => handleEvent(JSON.parse(line)));
+          }
+          if (buffer.trim()) handleEvent(JSON.parse(buffer));
 
           return { success: true, displayAdded };
         } catch (error) {
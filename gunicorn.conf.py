@@ -0,0 +1,88 @@
+"""gunicorn settings, sized from the CPUs and memory this container may actually use.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Each worker process holds its own spaCy pipeline (~WORKER_MEMORY_MB), so
+workers are capped by memory as well as CPUs. Within a worker, gthread
+threads serve the I/O-bound stages (NewsAPI, page fetches, GPT) while
+admission control (NLP_CONCURRENCY) bounds the CPU-bound NLP.
+"""
+import math
+import os
+from config import Config
+
+def available_cpus():
+    """CPUs this process may run on, reduced by a cgroup CPU quota if one is set"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _read_cpu_quota()
+    if quota:
+        cpus = min(cpus, max(1, math.floor(quota)))
+    return cpus
+
+def _read_cpu_quota():
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        return None if quota == 'max' else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def available_memory_mb():
+    """Memory limit of the container, else the machine's physical memory"""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                limit = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "no limit" as a huge number
+        if limit != 'max' and int(limit) < 1 << 60:
+            return int(limit) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError):
+        return None
+
+def default_workers():
+    cpus = available_cpus()
+    memory = available_memory_mb()
+    if memory:
+        return max(1, min(cpus, memory // Config.WORKER_MEMORY_MB))
+    return cpus
+
+def default_timeout():
+    # Longest a request can legitimately take: waiting for an NLP slot, then
+    # related articles, page fetches and GPT, plus margin for the NLP itself
+    return math.ceil(Config.NLP_QUEUE_TIMEOUT + Config.RELATED_TIMEOUT + Config.FETCH_TIMEOUT
+                     + Config.GPT_TIMEOUT) + 30
+
+bind = f'{Config.HOST}:{Config.PORT}'
+workers = Config.WEB_CONCURRENCY or default_workers()
+worker_class = Config.GUNICORN_WORKER_CLASS
+# gunicorn quietly turns a sync worker into gthread when threads > 1
+threads = Config.GUNICORN_THREADS if worker_class == 'gthread' else 1
+if worker_class == 'gevent':
+    # gevent needs `pip install gevent`; greenlets share the NLP slots the same way threads do
+    worker_connections = 100
+# Load the models once in the master and fork; gevent patches the stdlib per worker, so it loads there
+preload_app = Config.PRELOAD_MODELS and worker_class != 'gevent'
+timeout = Config.GUNICORN_TIMEOUT or default_timeout()
+graceful_timeout = 30
+keepalive = 5
+
+def when_ready(server):
+    server.log.info(f"Serving with {workers} {worker_class} worker(s), {threads} thread(s) each, "
+                    f"NLP concurrency {Config.NLP_CONCURRENCY or 'unlimited'} per worker")
@@ -0,0 +1,179 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from sqlite_local import LocalConnection
+
+class JobQueue:
+    """Durable FIFO of analysis jobs in SQLite, shared by every worker process on the machine.
+
+    A claimed job is leased; if the process running it dies, the job is
+    picked up again once the lease runs out, up to ``max_attempts`` times.
+    """
+
+    def __init__(self, path, lease_seconds=120, max_attempts=3, result_ttl=3600):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        # Autocommit, so claim() can take the write lock with BEGIN IMMEDIATE
+        self._connection = LocalConnection(path, isolation_level=None)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, '
+            'result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, '
+            'created_at REAL NOT NULL, updated_at REAL NOT NULL, lease_until REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+
+    def enqueue(self, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connection().execute(
+            'INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (job_id, 'queued', json.dumps(payload), now, now)
+        )
+        return job_id
+
+    def claim(self):
+        """Lease the oldest queued job (or one whose lease expired) and return (id, payload)"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT id, payload, attempts FROM jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            job_id, payload, attempts = row
+            if attempts >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    ('Job was abandoned too many times', now, job_id)
+                )
+                conn.execute('COMMIT')
+                print(f"Giving up on job {job_id} after {attempts} attempts")
+                return self.claim()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "lease_until = ?, updated_at = ? WHERE id = ?",
+                (now + self.lease_seconds, now, job_id)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return job_id, json.loads(payload)
+
+    def complete(self, job_id, result):
+        self._finish(job_id, 'done', json.dumps(result), None)
+
+    def fail(self, job_id, error):
+        self._finish(job_id, 'failed', None, error)
+
+    def _finish(self, job_id, status, result, error):
+        self._connection().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? '
+            'WHERE id = ?',
+            (status, result, error, time.time(), job_id)
+        )
+
+    def get(self, job_id):
+        row = self._connection().execute(
+            'SELECT status, result, error, created_at, updated_at FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, result, error, created_at, updated_at = row
+        job = {'job_id': job_id, 'status': status, 'created_at': created_at, 'updated_at': updated_at}
+        if result is not None:
+            job['result'] = json.loads(result)
+        if error is not None:
+            job['error'] = error
+        return job
+
+    def purge(self):
+        """Forget finished jobs older than result_ttl"""
+        self._connection().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (time.time() - self.result_ttl,)
+        )
+
+class JobWorkerPool:
+    """Background threads that run queued jobs through ``handler(payload) -> result``.
+
+    Threads don't survive a fork, so each gunicorn worker starts its own pool
+    on first use; all of them drain the same queue.
+    """
+
+    def __init__(self, queue, handler, workers=4, poll_interval=0.5):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._threads = [
+                threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _run(self):
+        last_purge = 0
+        while True:
+            try:
+                claimed = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f"Error claiming job: {e}")
+                claimed = None
+            if claimed is None:
+                if time.monotonic() - last_purge > 60:
+                    last_purge = time.monotonic()
+                    self._purge()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            job_id, payload = claimed
+            try:
+                try:
+                    result = self.handler(payload)
+                except Exception as e:
+                    print(f"Error running job {job_id}: {e}")
+                    self.queue.fail(job_id, str(e))
+                else:
+                    self.queue.complete(job_id, result)
+            except sqlite3.Error as e:
+                # The lease runs out and another worker retries the job
+                print(f"Error saving job {job_id}: {e}")
+
+    def _purge(self):
+        try:
+            self.queue.purge()
+        except sqlite3.Error as e:
+            print(f"Error purging jobs: {e}")
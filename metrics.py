@@ -0,0 +1,124 @@
+"""Prometheus-style counters and histograms, plus per-request stage timings for Server-Timing.
+
+Metrics live in process memory, so each gunicorn worker exposes its own values.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from config import Config
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] += amount
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    bucket_labels = labels + (('le', bound),)
+                    lines.append(f'{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(labels)} {cumulative}')
+        return lines
+
+stage_seconds = Histogram('newsperspective_stage_seconds', 'Time spent in each analysis stage')
+http_request_seconds = Histogram('newsperspective_http_request_seconds', 'Request duration by endpoint')
+http_requests = Counter('newsperspective_http_requests_total', 'Requests by endpoint and status')
+cache_requests = Counter('newsperspective_cache_requests_total', 'Cache lookups by cache and result')
+stage_timeouts = Counter('newsperspective_stage_timeouts_total', 'Stages that missed their time budget')
+upstream_errors = Counter('newsperspective_upstream_errors_total', 'Failed calls to external services')
+upstream_retries = Counter('newsperspective_upstream_retries_total', 'Retried calls to external services')
+upstream_coalesced = Counter('newsperspective_upstream_coalesced_total', 'Calls answered by an identical call in flight')
+rate_limit_waits = Counter('newsperspective_rate_limit_waits_total', 'Calls delayed or rejected by a rate limit')
+admission_rejections = Counter('newsperspective_admission_rejections_total', 'Requests turned away by NLP admission control')
+
+ALL_METRICS = [stage_seconds, http_request_seconds, http_requests, cache_requests, stage_timeouts,
+               upstream_errors, upstream_retries, upstream_coalesced, rate_limit_waits, admission_rejections]
+
+def expose():
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+# Stage timings of the current request, read back into the Server-Timing header
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+def start_request_timings():
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+def request_timings():
+    return _request_timings.get()
+
+@contextmanager
+def span(stage):
+    timings = _request_timings.get()
+    if timings is None and not Config.METRICS_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if Config.METRICS_ENABLED:
+            stage_seconds.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def server_timing_header(timings):
+    # Stages that ran several times (e.g. one page fetch per candidate) are summed
+    totals = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0) + elapsed
+    return ', '.join(f'{stage};dur={elapsed * 1000:.1f}' for stage, elapsed in totals.items())
@@ -0,0 +1,38 @@
+from metrics import span
+
+class AnalysisContext:
+    """Parse an article once and share the Doc and sentences between analyzers"""
+
+    def __init__(self, text, nlp=None, disable=(), doc=None):
+        self.text = text
+        self.nlp = nlp
+        self.disable = list(disable)
+        # A Doc that was already parsed, e.g. by nlp.pipe
+        self._doc = doc
+        self._sentences = None
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            with span('spacy_parse'):
+                self._doc = self.nlp(self.text, disable=self.disable)
+        return self._doc
+
+    @property
+    def sentences(self):
+        if self._sentences is None:
+            self._sentences = list(self.doc.sents)
+        return self._sentences
+
+def sentence_offsets(sentences, base=0):
+    """(start, end) character offsets of each sentence without its surrounding whitespace, plus base"""
+    offsets = []
+    for sent in sentences:
+        text = sent.text
+        stripped = text.strip()
+        if not stripped:
+            offsets.append(None)
+            continue
+        start = base + sent.start_char + len(text) - len(text.lstrip())
+        offsets.append((start, start + len(stripped)))
+    return offsets
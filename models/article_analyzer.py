@@ -1,32 +1,53 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from nltk.corpus import stopwords
-import spacy
+import multiprocessing
+from collections import namedtuple
 import numpy as np
 from string import punctuation
-from newsapi import NewsApiClient
+from config import Config
 from .bias_analyzer import BiasAnalyzer, PoliticalAnalyzer
+from .analysis_context import AnalysisContext, sentence_offsets
+from .chunking import split_chunks
+from .registry import registry
+from .keyword_idf import top_terms
+from metrics import span, upstream_errors
+from upstream import newsapi_upstream
+
+# Part of the analysis cache key: bump it when a change to the models, lexicons
+# or output format changes what analyze_article returns for the same text
+ANALYSIS_VERSION = 1
+
+KeywordCandidates = namedtuple('KeywordCandidates', ['noun_phrases', 'entities', 'sentences', 'important_words'])
 
 class KeywordExtractor:
-    def __init__(self):
-        self.nlp = spacy.load('en_core_web_sm')
-        self.stop_words = set(stopwords.words('english'))
-        self.stop_words.update(['would', 'could', 'should', 'may', 'might', 'must', 'need'])
+    # Needs noun chunks, entities, sentences and POS tags; lemmas are never looked at
+    disabled_components = ['lemmatizer']
+
+    extra_stop_words = {'would', 'could', 'should', 'may', 'might', 'must', 'need'}
+
+    @property
+    def nlp(self):
+        return registry.nlp
+    
+    @property
+    def stop_words(self):
+        return registry.stop_words | self.extra_stop_words
         
-    def extract_keywords(self, text):
+    def extract_keywords(self, text, context=None):
         """Extract keywords using multiple methods and combine results"""
-        doc = self.nlp(text)
-        
+        if context is None:
+            context = AnalysisContext(text, self.nlp, self.disabled_components)
+        doc = context.doc
+        sentences = context.sentences
+        with span('keyword_extraction'):
+            return self._extract_keywords(doc, sentences)
+    
+    def _extract_keywords(self, doc, sentences):
+        return self.score_keywords(self.keyword_candidates(doc, sentences))
+    
+    def keyword_candidates(self, doc, sentences):
+        """The phrases and sentences keywords are chosen from; those of consecutive chunks concatenate"""
         noun_phrases = [chunk.text.lower() for chunk in doc.noun_chunks]
         entities = [ent.text.lower() for ent in doc.ents]
         
-        sentences = [sent.text for sent in doc.sents]
-        tfidf = TfidfVectorizer(ngram_range=(1, 2), stop_words='english')
-        tfidf_matrix = tfidf.fit_transform(sentences)
-        
-        feature_names = tfidf.get_feature_names_out()
-        tfidf_scores = np.asarray(tfidf_matrix.mean(axis=0)).ravel()
-        top_tfidf = [feature_names[i] for i in tfidf_scores.argsort()[-10:][::-1]]
-        
         important_words = []
         for token in doc:
             if (not token.is_stop and not token.is_punct and 
@@ -34,6 +55,17 @@ class KeywordExtractor:
                 len(token.text) > 2):
                 important_words.append(token.text.lower())
         
+        return KeywordCandidates(noun_phrases, entities, [sent.text for sent in sentences], important_words)
+    
+    def score_keywords(self, candidates):
+        noun_phrases, entities, sentences, important_words = candidates
+        
+        idf = registry.keyword_idf
+        if idf is not None:
+            top_tfidf = top_terms(sentences, idf, k=10)
+        else:
+            top_tfidf = self._top_article_tfidf(sentences)
+        
         all_keywords = set(noun_phrases + entities + top_tfidf + important_words)
         
         filtered_keywords = []
@@ -44,6 +76,11 @@ class KeywordExtractor:
                 not all(c in punctuation for c in keyword)):
                 filtered_keywords.append(keyword)
         
+        noun_phrases = set(noun_phrases)
+        entities = set(entities)
+        top_tfidf = set(top_tfidf)
+        important_words = set(important_words)
+        
         keyword_scores = {}
         for keyword in filtered_keywords:
             score = 0
@@ -55,36 +92,185 @@ class KeywordExtractor:
         
         sorted_keywords = sorted(keyword_scores.items(), key=lambda x: x[1], reverse=True)
         return [k for k, s in sorted_keywords[:5]]
+    
+    def _top_article_tfidf(self, sentences):
+        # Fallback when no corpus IDF table is available: rarity within the article itself
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        tfidf = TfidfVectorizer(ngram_range=(1, 2), stop_words='english')
+        tfidf_matrix = tfidf.fit_transform(sentences)
+        
+        feature_names = tfidf.get_feature_names_out()
+        tfidf_scores = np.asarray(tfidf_matrix.mean(axis=0)).ravel()
+        return [feature_names[i] for i in tfidf_scores.argsort()[-10:][::-1]]
 
 class ArticleAnalyzer:
+    # One parse with the union of components the analyzers need
+    disabled_components = sorted(set(BiasAnalyzer.disabled_components) &
+                                 set(KeywordExtractor.disabled_components))
+
     def __init__(self, news_api_key):
-        self.newsapi = NewsApiClient(api_key=news_api_key)
+        self.news_api_key = news_api_key
+        self._newsapi = None
         self.bias_analyzer = BiasAnalyzer()
         self.keyword_extractor = KeywordExtractor()
+        self.political_analyzer = PoliticalAnalyzer()
+    
+    @property
+    def newsapi(self):
+        # Imported on first use so booting a worker stays cheap
+        if self._newsapi is None:
+            from newsapi import NewsApiClient
+            self._newsapi = NewsApiClient(api_key=self.news_api_key)
+        return self._newsapi
+    
+    @newsapi.setter
+    def newsapi(self, client):
+        self._newsapi = client
+    
+    def analyze_article(self, article_text, on_keywords=None):
+        """Run every analyzer over one shared parse.
+
+        on_keywords is called as soon as the keywords are known, so callers can
+        start the related-article lookup while the rest of the analysis runs.
+        Text longer than CHUNKED_ANALYSIS_CHARS goes to analyze_long_article.
+        """
+        if len(article_text) > Config.CHUNKED_ANALYSIS_CHARS:
+            return self.analyze_long_article(article_text, on_keywords)
+        context = AnalysisContext(article_text, registry.nlp, self.disabled_components)
+        return self._analyze_context(context, on_keywords)
+    
+    def analyze_long_article(self, article_text, on_keywords=None):
+        """Analyze text of any length with one chunk's Doc in memory at a time.
+
+        The text is cut on paragraph (else line or sentence) boundaries into
+        chunks of at most ANALYSIS_CHUNK_CHARS, parsed one by one with
+        nlp.pipe. Each chunk only leaves behind its sentence texts, sentence
+        features, partisan hits and keyword candidates, plus a few tokens at
+        each end to find partisan phrases running across a cut; the scores are then
+        computed from those by the same code as analyze_article, so chunks
+        that parse like the whole text give exactly the same result.
+        """
+        # Only whether a phrase occurs matters, so candidates keep their first occurrence
+        noun_phrases, entities, important_words = {}, {}, {}
+        sentence_texts, offsets, features, within, across = [], [], [], [], []
+        
+        chunks = split_chunks(article_text, Config.ANALYSIS_CHUNK_CHARS)
+        docs = iter(registry.nlp.pipe(chunks, batch_size=1, disable=self.disabled_components))
+        # The chunks rejoin to the text, so a chunk starts where the previous ones end
+        base = 0
+        previous_tail = ''
+        while True:
+            with span('spacy_parse'):
+                doc = next(docs, None)
+            if doc is None:
+                break
+            sentences = list(doc.sents)
+            offsets.extend(sentence_offsets(sentences, base))
+            base += len(doc.text)
+            candidates = self.keyword_extractor.keyword_candidates(doc, sentences)
+            noun_phrases.update(dict.fromkeys(candidates.noun_phrases))
+            entities.update(dict.fromkeys(candidates.entities))
+            important_words.update(dict.fromkeys(candidates.important_words))
+            sentence_texts.extend(candidates.sentences)
+            with span('sentence_features'):
+                features.extend(self.bias_analyzer.sentence_features(sentences))
+            with span('political_scoring'):
+                chunk_within, chunk_across = self.political_analyzer.political_hits(doc, sentences)
+                head, tail = self.political_analyzer.cut_context(doc)
+                if previous_tail:
+                    chunk_across.extend(self.political_analyzer.hits_across_cut(previous_tail, head))
+                previous_tail = tail
+            within.extend(chunk_within)
+            across.extend(chunk_across)
+            del doc, sentences
+        
+        with span('keyword_extraction'):
+            keywords = self.keyword_extractor.score_keywords(KeywordCandidates(
+                list(noun_phrases), list(entities), sentence_texts, list(important_words)
+            ))
+        if on_keywords is not None:
+            on_keywords(keywords)
+        
+        return {
+            'bias_analysis': self.bias_analyzer.aggregate(sentence_texts, features),
+            'keywords': keywords,
+            'political_analysis': self.political_analyzer.score_leaning(within + across),
+            'sentence_spans': self.bias_analyzer.reported_spans(offsets, features),
+            # The parser sees each chunk on its own, so scores can differ from a single parse
+            'analysis_mode': 'chunked'
+        }
     
-    def analyze_article(self, article_text):
-        bias_analysis = self.bias_analyzer.analyze(article_text)
-        keywords = self.keyword_extractor.extract_keywords(article_text)
+    def analyze_articles(self, texts, batch_size=32, n_process=1):
+        """Analyze many articles, yielding results in input order as they complete.
+
+        An article that fails yields ``{'status': 'error', 'error': message}``
+        in its place. Batches are parsed with nlp.pipe. With n_process > 1 whole batches,
+        parsing and scoring alike, are spread over forked worker processes.
+        """
+        if n_process <= 1:
+            yield from self._analyze_batch(texts, batch_size)
+            return
         
-        political_analyzer = PoliticalAnalyzer()
-        political_analysis = political_analyzer.analyze_political_leaning(article_text)
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        with multiprocessing.get_context('fork').Pool(
+            n_process, initializer=_init_batch_worker, initargs=(self,)
+        ) as pool:
+            for results in pool.imap(_analyze_batch_in_worker, batches):
+                yield from results
+    
+    def _analyze_batch(self, texts, batch_size):
+        # Long texts are analyzed on their own, in chunks; the rest share nlp.pipe
+        docs = registry.nlp.pipe(
+            [text for text in texts if len(text) <= Config.CHUNKED_ANALYSIS_CHARS],
+            batch_size=batch_size, disable=self.disabled_components
+        )
+        for text in texts:
+            # One article that cannot be analyzed must not end the batch
+            try:
+                if len(text) > Config.CHUNKED_ANALYSIS_CHARS:
+                    result = self.analyze_long_article(text)
+                else:
+                    result = self._analyze_context(AnalysisContext(text, doc=next(docs)))
+            except Exception as e:
+                print(f"Error analyzing article in batch: {e}")
+                result = {'status': 'error', 'error': str(e)}
+            yield result
+    
+    def _analyze_context(self, context, on_keywords=None):
+        article_text = context.text
+        keywords = self.keyword_extractor.extract_keywords(article_text, context)
+        if on_keywords is not None:
+            on_keywords(keywords)
+        
+        sentences = context.sentences
+        with span('sentence_features'):
+            features = self.bias_analyzer.sentence_features(sentences)
+        bias_analysis = self.bias_analyzer.aggregate([sent.text for sent in sentences], features)
+        political_analysis = self.political_analyzer.analyze_political_leaning(article_text, context)
         
         return {
             'bias_analysis': bias_analysis,
             'keywords': keywords,
-            'political_analysis': political_analysis
+            'political_analysis': political_analysis,
+            # Where the reported sentences are in article_text, for the compact response
+            'sentence_spans': self.bias_analyzer.reported_spans(sentence_offsets(sentences), features)
         }
     
     def find_related_articles(self, keywords, max_articles=10):
         query = ' AND '.join(f'"{keyword}"' for keyword in keywords[:3])
         
         try:
-            articles = self.newsapi.get_everything(
-                q=query,
-                language='en',
-                sort_by='relevancy',
-                page_size=max_articles
-            )
+            with span('newsapi_query'):
+                # Identical concurrent queries share one request
+                articles = newsapi_upstream.call(
+                    ('everything', query, max_articles),
+                    self.newsapi.get_everything,
+                    q=query,
+                    language='en',
+                    sort_by='relevancy',
+                    page_size=max_articles,
+                    budget=Config.RELATED_TIMEOUT
+                )
             
             filtered_articles = []
             for article in articles.get('articles', []):
@@ -96,5 +282,16 @@ class ArticleAnalyzer:
             
             return filtered_articles[:max_articles]
         except Exception as e:
+            upstream_errors.inc(service='newsapi')
             print(f"Error fetching related articles: {e}")
             return []
+
+_batch_analyzer = None
+
+def _init_batch_worker(analyzer):
+    # Forked workers inherit the parent's loaded models copy-on-write
+    global _batch_analyzer
+    _batch_analyzer = analyzer
+
+def _analyze_batch_in_worker(texts):
+    return list(_batch_analyzer._analyze_batch(texts, len(texts)))
@@ -1,13 +1,21 @@
-import spacy
-from nltk.sentiment import SentimentIntensityAnalyzer
-from nltk.tokenize import sent_tokenize
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import numpy as np
+from .analysis_context import AnalysisContext
+from .registry import registry
+from .lexicon_matcher import LexiconMatcher
+from .sentence_memo import SentenceMemo
+from config import Config
+from metrics import span
+
+SENTIMENT_DTYPE = np.dtype([
+    ('compound', np.float64), ('pos', np.float64), ('neg', np.float64), ('neu', np.float64)
+])
+
+# What BiasAnalyzer keeps per sentence; the article-level scores are sums and means of these
+SentenceFeatures = namedtuple('SentenceFeatures', ['sentiment', 'categories', 'subjective_words', 'words'])
 
 class PoliticalAnalyzer:
     def __init__(self):
-        self.nlp = spacy.load('en_core_web_sm')
-        
         self.partisan_indicators = {
             'left': {
                 'terms': {
@@ -47,11 +55,68 @@ class PoliticalAnalyzer:
                 'right': ['market-based healthcare', 'private insurance', 'personal responsibility']
             }
         }
+        
+        # Matcher category -> (direction, weight, framing issue)
+        self.lexicons = {}
+        self.lexicon_scoring = {}
+        for direction in ['left', 'right']:
+            self.lexicons[f'{direction}_terms'] = self.partisan_indicators[direction]['terms']
+            self.lexicon_scoring[f'{direction}_terms'] = (direction, 1, None)
+            self.lexicons[f'{direction}_phrases'] = self.partisan_indicators[direction]['phrases']
+            self.lexicon_scoring[f'{direction}_phrases'] = (direction, 1.5, None)
+        
+        for issue, frames in self.framing_patterns.items():
+            for direction, patterns in frames.items():
+                self.lexicons[f'{issue}_{direction}'] = patterns
+                self.lexicon_scoring[f'{issue}_{direction}'] = (direction, 1, issue)
+        
+        self._lexicon_matcher = None
+        # Sentence text -> the (category, phrase) hits in it
+        self.sentence_memo = SentenceMemo('political_sentences', Config.SENTENCE_CACHE_MAX_ENTRIES)
+    
+    @property
+    def nlp(self):
+        return registry.nlp
     
-    def analyze_political_leaning(self, text):
-        doc = self.nlp(text.lower())
-        text_lower = text.lower()
+    @property
+    def lexicon_matcher(self):
+        if self._lexicon_matcher is None:
+            self._lexicon_matcher = LexiconMatcher(self.nlp, self.lexicons)
+        return self._lexicon_matcher
+    
+    def analyze_political_leaning(self, text, context=None):
+        if context is None:
+            # Matching only needs tokens, so skip every pipeline component
+            context = AnalysisContext(text, self.nlp, self.nlp.pipe_names)
         
+        doc = context.doc
+        # Without a parser the doc has no sentences; match it as one piece
+        sentences = context.sentences if doc.has_annotation('SENT_START') else [doc[:]]
+        with span('political_scoring'):
+            within, across = self.political_hits(doc, sentences)
+        return self.score_leaning(within + across)
+    
+    def political_hits(self, doc, sentences):
+        """(category, phrase) hits inside the sentences, in order, and hits across their boundaries"""
+        within = [hit for hits in self.sentence_memo.features(sentences, self._sentence_hits)
+                  for hit in hits]
+        # Phrases split by the sentence segmenter still count
+        across = [(match.category, match.phrase)
+                  for match in self.lexicon_matcher.find_straddling(doc, sentences)]
+        return within, across
+    
+    def hits_across_cut(self, before, after):
+        """(category, phrase) hits that run from the end of before into after"""
+        return [(match.category, match.phrase) for match in self.lexicon_matcher.find_across(before, after)]
+    
+    def cut_context(self, doc):
+        """The text at the start and at the end of doc that a phrase crossing its edges could use"""
+        reach = self.lexicon_matcher.max_length - 1
+        if reach <= 0 or len(doc) == 0:
+            return '', ''
+        return doc[:reach].text, doc.text[doc[max(len(doc) - reach, 0)].idx:]
+    
+    def score_leaning(self, hits):
         scores = {
             'left': 0,
             'right': 0,
@@ -61,23 +126,13 @@ class PoliticalAnalyzer:
             }
         }
         
-        for direction in ['left', 'right']:
-            for term in self.partisan_indicators[direction]['terms']:
-                if term in text_lower:
-                    scores[direction] += 1
-                    scores['indicators'][direction].append(term)
-            
-            for phrase in self.partisan_indicators[direction]['phrases']:
-                if phrase in text_lower:
-                    scores[direction] += 1.5  
-                    scores['indicators'][direction].append(phrase)
-        
-        for issue, frames in self.framing_patterns.items():
-            for direction, patterns in frames.items():
-                for pattern in patterns:
-                    if pattern in text_lower:
-                        scores[direction] += 1
-                        scores['indicators'][direction].append(f"{issue}: {pattern}")
+        for category, phrase in set(hits):
+            direction, weight, issue = self.lexicon_scoring[category]
+            scores[direction] += weight
+            if issue:
+                scores['indicators'][direction].append(f"{issue}: {phrase}")
+            else:
+                scores['indicators'][direction].append(phrase)
         
         total_score = scores['left'] + scores['right']
         if total_score > 0:
@@ -108,12 +163,15 @@ class PoliticalAnalyzer:
                 'right_indicators': list(set(scores['indicators']['right']))
             }
         }
+    
+    def _sentence_hits(self, sent):
+        return tuple({(match.category, match.phrase) for match in self.lexicon_matcher.find(sent)})
 
 class BiasAnalyzer:
+    # Needs sentences, POS tags and lemmas; entities are never looked at
+    disabled_components = ['ner']
+
     def __init__(self):
-        self.nlp = spacy.load('en_core_web_sm')
-        self.sid = SentimentIntensityAnalyzer()
-        
         self.opinion_words = {
             'believe', 'think', 'feel', 'suggest', 'seem', 'appear', 'suspect',
             'assume', 'speculate', 'guess', 'imagine', 'presume', 'suppose'
@@ -139,44 +197,92 @@ class BiasAnalyzer:
             'conservative', 'liberal', 'notorious', 'infamous'
         }
         
-    def _detect_bias_indicators(self, doc):
+        # Category order is the order sentences are reported in
+        self.indicator_lexicons = {
+            'opinion_statements': self.opinion_words,
+            'extreme_language': self.extreme_words,
+            'hedging': self.hedge_words,
+            'emotional_language': self.emotional_words,
+            'loaded_words': self.loaded_words,
+            'unsubstantiated_claims': ['studies show', 'research shows', 'experts say'],
+            'generalizations': ['all', 'every', 'none', 'always', 'never']
+        }
+        self._lexicon_matcher = None
+        self.sentence_memo = SentenceMemo('bias_sentences', Config.SENTENCE_CACHE_MAX_ENTRIES)
+    
+    @property
+    def nlp(self):
+        return registry.nlp
+    
+    @property
+    def sid(self):
+        return registry.sentiment_analyzer
+        
+    @property
+    def lexicon_matcher(self):
+        if self._lexicon_matcher is None:
+            self._lexicon_matcher = LexiconMatcher(self.nlp, self.indicator_lexicons)
+        return self._lexicon_matcher
+        
+    def _detect_bias_indicators(self, sentence_texts, features):
+        return {
+            category: [sentence_texts[i].strip() for i in indices]
+            for category, indices in self._indicator_sentences(features).items()
+        }
+    
+    def _indicator_sentences(self, features):
         indicators = defaultdict(list)
         
-        for sent in doc.sents:
-            sent_text = sent.text.strip()
-            sent_lower = sent_text.lower()
-            
-            if any(word in sent_lower for word in self.opinion_words):
-                indicators['opinion_statements'].append(sent_text)
-            
-            if any(word in sent_lower for word in self.extreme_words):
-                indicators['extreme_language'].append(sent_text)
-            
-            if any(word in sent_lower for word in self.hedge_words):
-                indicators['hedging'].append(sent_text)
-            
-            if any(word in sent_lower for word in self.emotional_words):
-                indicators['emotional_language'].append(sent_text)
-            
-            if any(word in sent_lower for word in self.loaded_words):
-                indicators['loaded_words'].append(sent_text)
-            
-            if any(word in sent_lower for word in ['studies show', 'research shows', 'experts say']):
-                indicators['unsubstantiated_claims'].append(sent_text)
-            
-            if any(word in sent_lower for word in ['all', 'every', 'none', 'always', 'never']):
-                indicators['generalizations'].append(sent_text)
+        for i, feature in enumerate(features):
+            for category in feature.categories:
+                indicators[category].append(i)
         
         return {k: v for k, v in indicators.items() if v}
 
-    def analyze(self, text):
-        doc = self.nlp(text)
+    def analyze(self, text, context=None):
+        if context is None:
+            context = AnalysisContext(text, self.nlp, self.disabled_components)
+        
+        sentences = context.sentences
+        
+        with span('sentence_features'):
+            features = self.sentence_features(sentences)
+        
+        return self.aggregate([sent.text for sent in sentences], features)
+    
+    def reported_spans(self, sentence_offsets, features):
+        """Offsets of the sentences aggregate reports, in the same lists as its bias_indicators and emotional_language"""
+        compound = np.array([feature.sentiment[0] for feature in features], dtype=np.float64)
+        return {
+            'bias_indicators': {
+                category: [sentence_offsets[i] for i in indices]
+                for category, indices in self._indicator_sentences(features).items()
+            },
+            'emotional_language': [sentence_offsets[i] for i in self._emotional_sentences(compound)]
+        }
+    
+    def sentence_features(self, sentences):
+        # POS tags and lemmas depend on the rest of the document, so only the
+        # text-only features are memoized and subjective words are counted every time
+        lexical = self.sentence_memo.features(sentences, self._lexical_features)
+        return [
+            SentenceFeatures(sentiment, categories, self._count_subjective_words(sent), words)
+            for sent, (sentiment, categories, words) in zip(sentences, lexical)
+        ]
+    
+    def aggregate(self, sentence_texts, features):
+        """Article-level scores from every sentence's text and features, in document order"""
+        sentence_scores = np.array([feature.sentiment for feature in features], dtype=SENTIMENT_DTYPE)
+        sentiment_scores = self._analyze_sentiment(sentence_scores)
+        emotional_language = self._detect_emotional_language(sentence_texts, sentence_scores)
+        bias_indicators = self._detect_bias_indicators(sentence_texts, features)
+        subjectivity_score = self._calculate_subjectivity(features)
         
         analysis = {
-            'sentiment_scores': self._analyze_sentiment(text),
-            'bias_indicators': self._detect_bias_indicators(doc),
-            'subjectivity_score': self._calculate_subjectivity(doc),
-            'emotional_language': self._detect_emotional_language(doc),
+            'sentiment_scores': sentiment_scores,
+            'bias_indicators': bias_indicators,
+            'subjectivity_score': subjectivity_score,
+            'emotional_language': emotional_language,
             'overall_bias_score': 0.0  # Will be calculated
         }
         
@@ -184,47 +290,48 @@ class BiasAnalyzer:
         
         return analysis
     
-    def _analyze_sentiment(self, text):
-        sentences = sent_tokenize(text)
-        sentiments = []
-        
-        for sentence in sentences:
-            scores = self.sid.polarity_scores(sentence)
-            sentiments.append(scores)
-            
-        avg_sentiment = {
-            'compound': np.mean([s['compound'] for s in sentiments]),
-            'pos': np.mean([s['pos'] for s in sentiments]),
-            'neg': np.mean([s['neg'] for s in sentiments]),
-            'neu': np.mean([s['neu'] for s in sentiments])
-        }
-        
-        return avg_sentiment
+    def _lexical_features(self, sent):
+        """(sentiment, categories, words) of one sentence, which depend on its text alone"""
+        polarity = self.sid.polarity_scores(sent.text)
+        # The matcher compares lowercased tokens, not tags
+        found = {match.category for match in self.lexicon_matcher.find(sent)}
+        return (
+            (polarity['compound'], polarity['pos'], polarity['neg'], polarity['neu']),
+            # Category order is the order sentences are reported in
+            tuple(category for category in self.indicator_lexicons if category in found),
+            sum(1 for token in sent if not token.is_punct)
+        )
     
-    def _calculate_subjectivity(self, doc):
-        subjective_words = 0
-        total_words = len([token for token in doc if not token.is_punct])
-        
-        for token in doc:
+    def _count_subjective_words(self, sent):
+        return sum(
+            1 for token in sent
             if (token.pos_ in ['ADJ', 'ADV'] or 
                 token.lemma_ in self.opinion_words or 
-                token.lemma_ in self.extreme_words):
-                subjective_words += 1
+                token.lemma_ in self.extreme_words)
+        )
+    
+    def _analyze_sentiment(self, sentence_scores):
+        # VADER scores fragments without words (e.g. a stray ".") as all zeros; keep them out of the averages
+        scored = sentence_scores[(sentence_scores['pos'] + sentence_scores['neg'] + sentence_scores['neu']) > 0]
+        if len(scored) == 0:
+            scored = sentence_scores
+        return {name: scored[name].mean() for name in SENTIMENT_DTYPE.names}
+    
+    def _calculate_subjectivity(self, features):
+        subjective_words = sum(feature.subjective_words for feature in features)
+        total_words = sum(feature.words for feature in features)
         
         return subjective_words / total_words if total_words > 0 else 0
     
-    def _detect_emotional_language(self, doc):
-        emotional_phrases = []
-        
-        for sent in doc.sents:
-            scores = self.sid.polarity_scores(sent.text)
-            if abs(scores['compound']) > 0.5:  
-                emotional_phrases.append({
-                    'text': sent.text,
-                    'intensity': scores['compound']
-                })
-        
-        return emotional_phrases
+    def _detect_emotional_language(self, sentence_texts, sentence_scores):
+        compound = sentence_scores['compound']
+        return [
+            {'text': sentence_texts[i], 'intensity': float(compound[i])}
+            for i in self._emotional_sentences(compound)
+        ]
+    
+    def _emotional_sentences(self, compound):
+        return np.flatnonzero(np.abs(compound) > 0.5)
     
     def _calculate_overall_bias(self, analysis):
         sentiment_weight = 0.3
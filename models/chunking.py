@@ -0,0 +1,36 @@
+import re
+
+# Preferred places to cut, best first; a cut goes right after the match
+_BOUNDARIES = [
+    re.compile(r'\n[^\S\n]*\n\s*'),   # blank line between paragraphs
+    re.compile(r'\n\s*'),             # line break
+    re.compile(r'(?<=[.!?])\s+'),     # sentence end
+    re.compile(r'\s+')
+]
+
+def split_chunks(text, max_chars):
+    """Cut text into consecutive pieces of at most max_chars characters that join back into text.
+
+    Each cut is made at the last paragraph break that fits, else the last line
+    break, sentence end or whitespace; only a run of max_chars characters
+    without any whitespace is cut mid-word.
+    """
+    chunks = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = _cut(text, start, start + max_chars)
+        chunks.append(text[start:end])
+        start = end
+    if start < len(text) or not chunks:
+        chunks.append(text[start:])
+    return chunks
+
+def _cut(text, start, limit):
+    window = text[start:limit]
+    for boundary in _BOUNDARIES:
+        last = None
+        for last in boundary.finditer(window):
+            pass
+        if last is not None and last.end() > 0:
+            return start + last.end()
+    return limit
@@ -0,0 +1,116 @@
+from urllib.parse import urlparse
+from cache import ResultCache, content_key
+from metrics import span
+from .minhash import MinHasher, signature_from_dict, signature_to_dict
+
+# Greedy ranking weights: keep some of the search order, but prefer new sources and other leanings
+RELEVANCE_WEIGHT = 1.0
+SOURCE_WEIGHT = 0.5
+LEANING_WEIGHT = 1.0
+
+class CandidateRanker:
+    """Choose which related articles are worth comparing with the user's article.
+
+    Related articles whose title and description are near-duplicates of each
+    other (syndicated wire copies) collapse to the most relevant one, and any
+    that repeat the user's own article are dropped. The rest are ordered so
+    that other sources and other political leanings come first. Per-URL
+    summaries (MinHash signature and leaning) are kept in ``signature_cache``.
+
+    MinHash only compares summaries with each other, which are about the same
+    size. Summaries and pages are checked against the user's article with its
+    exact shingle set: a signature of a whole article says little about
+    whether forty words of a summary occur in it.
+    """
+
+    def __init__(self, political_analyzer, signature_cache=None, threshold=0.8, hasher=None):
+        self.political_analyzer = political_analyzer
+        self.signature_cache = signature_cache
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        # In memory only: a request checks the same article several times
+        self.article_shingles = ResultCache('article_shingles', max_entries=64)
+
+    def own_shingles(self, article_text):
+        key = content_key('shingles', article_text)
+        shingles = self.article_shingles.get(key)
+        if shingles is None:
+            shingles = frozenset(self.hasher.shingle_hashes(article_text))
+            self.article_shingles.set(key, shingles)
+        return shingles
+
+    def summary(self, article):
+        """Signature and leaning of the article's title, description and snippet"""
+        def compute():
+            text = _summary_text(article)
+            return {
+                'signature': signature_to_dict(self.hasher.signature(text)),
+                'lean': _lean(self.political_analyzer.analyze_political_leaning(text))
+            }
+        return self._cached(content_key('summary', article.get('url') or ''), compute)
+
+    def _cached(self, key, compute):
+        value = self.signature_cache.get(key) if self.signature_cache is not None else None
+        if value is None:
+            value = compute()
+            if self.signature_cache is not None:
+                self.signature_cache.set(key, value)
+        return value
+
+    def collapse(self, article_text, related_articles):
+        """Drop near-duplicates among the related articles and of the user's article"""
+        if not related_articles:
+            return related_articles
+        with span('candidate_ranking'):
+            own = self.own_shingles(article_text)
+            signatures = [signature_from_dict(self.summary(article)['signature'])
+                          for article in related_articles]
+            kept = []
+            for cluster in self.hasher.clusters(signatures, self.threshold):
+                first = cluster[0]
+                summary = self.hasher.shingle_hashes(_summary_text(related_articles[first]))
+                if _share(summary, own) < self.threshold:
+                    kept.append(first)
+            return [related_articles[i] for i in sorted(kept)]
+
+    def rank(self, related_articles, political_analysis, url=None):
+        """Order candidates by relevance plus how different their source and leaning are"""
+        with span('candidate_ranking'):
+            own_lean = _lean(political_analysis)
+            seen_sources = {_source(url)} if url else set()
+            remaining = [(position, article, self.summary(article)['lean'])
+                         for position, article in enumerate(related_articles)]
+            ranked = []
+            while remaining:
+                def score(item):
+                    position, article, lean = item
+                    return (RELEVANCE_WEIGHT / (1 + position)
+                            + SOURCE_WEIGHT * (_source(article.get('url')) not in seen_sources)
+                            + LEANING_WEIGHT * abs(lean - own_lean) / 2)
+                best = max(remaining, key=score)
+                remaining.remove(best)
+                ranked.append(best[1])
+                seen_sources.add(_source(best[1].get('url')))
+            return ranked
+
+    def duplicates_article(self, article_text, page_text):
+        """Whether a fetched page turns out to be the user's article again"""
+        own = self.own_shingles(article_text)
+        page = self.hasher.shingle_hashes(page_text)
+        # Either one contained in the other; Jaccard similarity is never higher than both
+        return max(_share(own, page), _share(page, own)) >= self.threshold
+
+def _summary_text(article):
+    return ' '.join(filter(None, (article.get('title'), article.get('description'), article.get('content'))))
+
+def _share(part, whole):
+    """Share of part's shingles that also occur in whole"""
+    return len(part & whole) / len(part) if part else 0.0
+
+def _lean(political_analysis):
+    # -1 (all left indicators) to 1 (all right indicators)
+    return (political_analysis['right_percentage'] - political_analysis['left_percentage']) / 100
+
+def _source(url):
+    netloc = urlparse(url or '').netloc.lower()
+    return netloc[4:] if netloc.startswith('www.') else netloc
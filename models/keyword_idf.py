@@ -0,0 +1,65 @@
+import numpy as np
+
+N_BUCKETS = 2 ** 20
+
+_analyzer = None
+
+def term_analyzer(text):
+    # Same unigram/bigram analysis the per-article TfidfVectorizer used, without fitting anything.
+    # scikit-learn is only imported once keywords are first extracted.
+    global _analyzer
+    if _analyzer is None:
+        from sklearn.feature_extraction.text import CountVectorizer
+        _analyzer = CountVectorizer(ngram_range=(1, 2), stop_words='english').build_analyzer()
+    return _analyzer(text)
+
+def term_buckets(terms, n_buckets):
+    from sklearn.utils import murmurhash3_32
+    return np.fromiter(
+        (murmurhash3_32(term, positive=True) % n_buckets for term in terms),
+        dtype=np.int64, count=len(terms)
+    )
+
+def build_idf_table(texts, n_buckets=N_BUCKETS):
+    """Smoothed IDF per hashed term, as in TfidfVectorizer, over a corpus of documents.
+
+    Buckets that no document hits get the IDF of an unseen term, so the table
+    needs no vocabulary or metadata next to it.
+    """
+    document_frequency = np.zeros(n_buckets, dtype=np.int64)
+    n_documents = 0
+    for text in texts:
+        terms = list(set(term_analyzer(text)))
+        np.add.at(document_frequency, np.unique(term_buckets(terms, n_buckets)), 1)
+        n_documents += 1
+
+    idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+    return idf.astype(np.float32)
+
+def save_idf_table(path, idf):
+    np.save(path, idf)
+
+def load_idf_table(path):
+    # Memory-mapped, so gunicorn workers share the pages
+    return np.load(path, mmap_mode='r')
+
+def top_terms(sentences, idf, k=10):
+    """The k terms of an article with the highest tf * corpus idf"""
+    # Analyze per sentence so bigrams never span a sentence boundary
+    counts = {}
+    for sentence in sentences:
+        for term in term_analyzer(sentence):
+            counts[term] = counts.get(term, 0) + 1
+    if not counts:
+        return []
+
+    terms = list(counts)
+    tf = np.fromiter(counts.values(), dtype=np.float32, count=len(terms))
+    scores = tf * idf[term_buckets(terms, len(idf))]
+
+    if len(terms) > k:
+        top = np.argpartition(-scores, k)[:k]
+    else:
+        top = np.arange(len(terms))
+    top = top[np.argsort(-scores[top], kind='stable')]
+    return [terms[i] for i in top]
@@ -0,0 +1,109 @@
+from bisect import bisect_right
+from collections import namedtuple
+
+LexiconMatch = namedtuple('LexiconMatch', ['category', 'phrase', 'sentence', 'start', 'end'])
+
+# Inflections the suffix rules below get wrong
+IRREGULAR_FORMS = {
+    'think': ('thought',),
+    'feel': ('felt',)
+}
+
+def inflections(word):
+    """The word with its regular -s, -ed and -ing forms and any irregular ones.
+
+    Forms that are not English words are harmless: they never match a token.
+    """
+    if word.endswith('e'):
+        forms = [word + 's', word + 'd', word[:-1] + 'ing']
+    elif word.endswith('y') and len(word) > 1 and word[-2] not in 'aeiou':
+        forms = [word[:-1] + 'ies', word[:-1] + 'ied', word + 'ing']
+    elif word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        forms = [word + 'es', word + 'ed', word + 'ing']
+    else:
+        forms = [word + 's', word + 'ed', word + 'ing']
+    return [word, *forms, *IRREGULAR_FORMS.get(word, ())]
+
+class LexiconMatcher:
+    """Match several lexicons against a Doc in a single pass on token boundaries.
+
+    Single-word entries also match their inflected forms ("believes",
+    "suggested", "liberals") and are reported as the entry itself. Matching is
+    on lowercased tokens rather than lemmas because the analyzers run without
+    the lemmatizer and memoize hits by sentence text.
+    """
+
+    def __init__(self, nlp, lexicons):
+        from spacy.matcher import PhraseMatcher
+        self.matcher = PhraseMatcher(nlp.vocab, attr='LOWER')
+        self.make_doc = nlp.make_doc
+        self.entries = {}
+        # Longest phrase, in tokens
+        self.max_length = 0
+
+        for category, phrases in lexicons.items():
+            for phrase in phrases:
+                key = f'{category}|{phrase}'
+                pattern = nlp.make_doc(phrase)
+                if len(pattern) == 1:
+                    patterns = [nlp.make_doc(form) for form in inflections(phrase)]
+                else:
+                    patterns = [pattern]
+                self.matcher.add(key, patterns)
+                self.entries[nlp.vocab.strings[key]] = (category, phrase)
+                self.max_length = max(self.max_length, len(pattern))
+
+    def find(self, doc, sentences=None):
+        """Return every lexicon hit in a Doc or Span, with the index of the sentence it falls in.
+
+        Hits that straddle a sentence boundary are dropped when sentences are given.
+        """
+        sent_starts = [sent.start for sent in sentences] if sentences else None
+        matches = []
+
+        for match_id, start, end in self.matcher(doc):
+            category, phrase = self.entries[match_id]
+            sent_index = None
+            if sent_starts is not None:
+                sent_index = bisect_right(sent_starts, start) - 1
+                if end > sentences[sent_index].end:
+                    continue
+            matches.append(LexiconMatch(category, phrase, sent_index, start, end))
+
+        return matches
+
+    def find_straddling(self, doc, sentences):
+        """Return the hits that cross a boundary between two of the sentences.
+
+        Only a few tokens either side of each boundary are matched, so this is
+        cheap next to matching the whole doc.
+        """
+        reach = self.max_length - 1
+        matches = []
+        if reach <= 0:
+            return matches
+
+        for sent in sentences[1:]:
+            boundary = sent.start
+            window = doc[max(boundary - reach, 0):min(boundary + reach, len(doc))]
+            for match_id, start, end in self.matcher(window):
+                if start < boundary < end:
+                    category, phrase = self.entries[match_id]
+                    matches.append(LexiconMatch(category, phrase, None, start, end))
+
+        return matches
+
+    def find_across(self, before, after):
+        """Return the hits in before + after that run across the point where they join.
+
+        The two texts are only tokenized, which is all matching needs.
+        """
+        doc = self.make_doc(before + after)
+        offset = len(before)
+        matches = []
+        for match_id, start, end in self.matcher(doc):
+            last = doc[end - 1]
+            if doc[start].idx < offset < last.idx + len(last):
+                category, phrase = self.entries[match_id]
+                matches.append(LexiconMatch(category, phrase, None, start, end))
+        return matches
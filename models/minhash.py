@@ -0,0 +1,90 @@
+import re
+import zlib
+from collections import namedtuple
+import numpy as np
+
+# Largest 31-bit prime, so a * hash + b fits in 64 bits
+_PRIME = (1 << 31) - 1
+
+_WORD = re.compile(r'\w+')
+
+# values: the minimum permuted hash per permutation; size: number of distinct shingles
+Signature = namedtuple('Signature', ['values', 'size'])
+
+class MinHasher:
+    """MinHash signatures over word shingles, with LSH banding to find near-duplicates cheaply"""
+
+    def __init__(self, num_perm=128, bands=16, shingle_size=3, seed=489):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        words = _WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return {' '.join(words)} if words else set()
+        n = self.shingle_size
+        return {' '.join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+    def shingle_hashes(self, text):
+        """The text's shingles as a set of hashes, for exact overlap checks"""
+        return {zlib.crc32(shingle.encode('utf-8')) % _PRIME for shingle in self.shingles(text)}
+
+    def signature(self, text):
+        shingle_hashes = self.shingle_hashes(text)
+        if not shingle_hashes:
+            return Signature(np.full(self.num_perm, _PRIME, dtype=np.uint64), 0)
+        hashes = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+        # One row per permutation: (a * h + b) mod p, then the minimum over the shingles
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return Signature(permuted.min(axis=1), len(shingle_hashes))
+
+    def band_keys(self, signature):
+        values = signature.values
+        return [values[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def clusters(self, signatures, threshold):
+        """Group near-duplicates; each cluster lists input indices in order, so its first is the earliest"""
+        parent = list(range(len(signatures)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Only pairs that share a band are compared
+        buckets = {}
+        for i, signature in enumerate(signatures):
+            if signature.size == 0:
+                continue
+            for band, key in enumerate(self.band_keys(signature)):
+                buckets.setdefault((band, key), []).append(i)
+        for members in buckets.values():
+            for j in members[1:]:
+                first, other = find(members[0]), find(j)
+                if first != other and jaccard(signatures[members[0]], signatures[j]) >= threshold:
+                    parent[max(first, other)] = min(first, other)
+
+        groups = {}
+        for i in range(len(signatures)):
+            groups.setdefault(find(i), []).append(i)
+        return sorted(groups.values())
+
+def jaccard(a, b):
+    """Estimated Jaccard similarity of the two shingle sets"""
+    if a.size == 0 or b.size == 0:
+        return 0.0
+    return float(np.mean(a.values == b.values))
+
+def signature_to_dict(signature):
+    return {'values': signature.values.tolist(), 'size': signature.size}
+
+def signature_from_dict(data):
+    return Signature(np.asarray(data['values'], dtype=np.uint64), data['size'])
@@ -0,0 +1,157 @@
+import gc
+import importlib.util
+import os
+import sys
+import threading
+from config import Config
+from .keyword_idf import load_idf_table
+
+SPACY_MODEL = 'en_core_web_sm'
+
+# NLTK data the analyzers read, by downloader id and path inside an nltk_data directory
+NLTK_RESOURCES = {
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+    'stopwords': 'corpora/stopwords'
+}
+
+class ModelRegistry:
+    """Process-wide, lazily loaded spaCy pipeline, VADER analyzer and stopword set"""
+
+    def __init__(self, spacy_model=SPACY_MODEL, keyword_idf_path=None):
+        self.spacy_model = spacy_model
+        self.keyword_idf_path = keyword_idf_path
+        self._lock = threading.Lock()
+        self._nlp = None
+        self._sentiment_analyzer = None
+        self._stop_words = None
+        self._keyword_idf = None
+        self._keyword_idf_loaded = False
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    import spacy
+                    self._nlp = spacy.load(self.spacy_model)
+        return self._nlp
+
+    @property
+    def sentiment_analyzer(self):
+        if self._sentiment_analyzer is None:
+            with self._lock:
+                if self._sentiment_analyzer is None:
+                    from nltk.sentiment import SentimentIntensityAnalyzer
+                    self._sentiment_analyzer = SentimentIntensityAnalyzer()
+        return self._sentiment_analyzer
+
+    @property
+    def stop_words(self):
+        if self._stop_words is None:
+            with self._lock:
+                if self._stop_words is None:
+                    from nltk.corpus import stopwords
+                    self._stop_words = frozenset(stopwords.words('english'))
+        return self._stop_words
+
+    @property
+    def keyword_idf(self):
+        """Corpus IDF table for keyword extraction, or None when none has been built"""
+        if not self._keyword_idf_loaded:
+            with self._lock:
+                if not self._keyword_idf_loaded:
+                    if self.keyword_idf_path and os.path.exists(self.keyword_idf_path):
+                        self._keyword_idf = load_idf_table(self.keyword_idf_path)
+                    else:
+                        print(f"No keyword IDF table at {self.keyword_idf_path}; ranking keywords with "
+                              f"per-article TF-IDF (build one with build_keyword_idf.py)")
+                    self._keyword_idf_loaded = True
+        return self._keyword_idf
+
+    def missing_resources(self):
+        """Names of the models and data files that are not installed locally.
+
+        Only looks at the filesystem: nothing is imported or downloaded, so
+        this is safe to call at import time on a worker without network.
+        """
+        missing = []
+        if not os.path.isdir(self.spacy_model) and importlib.util.find_spec(self.spacy_model) is None:
+            missing.append(self.spacy_model)
+        for name, path in NLTK_RESOURCES.items():
+            if not _find_nltk_data(path):
+                missing.append(name)
+        return missing
+
+    def warm_up(self, freeze_gc=False):
+        """Load every model now instead of on first use.
+
+        Call this from the gunicorn master (``preload_app``) so forked workers
+        share the model pages copy-on-write, or from ``post_fork`` so each
+        worker is ready before its first request. ``freeze_gc`` moves the
+        loaded objects out of the collector's reach so later collections in
+        the workers do not touch, and therefore copy, those pages.
+        """
+        self.nlp
+        self.sentiment_analyzer
+        self.stop_words
+        self.keyword_idf
+        if freeze_gc:
+            gc.collect()
+            gc.freeze()
+        return self
+
+def _nltk_data_dirs():
+    # The same directories nltk.data.path searches, without importing nltk
+    dirs = [d for d in os.environ.get('NLTK_DATA', '').split(os.pathsep) if d]
+    dirs.append(os.path.expanduser('~/nltk_data'))
+    for prefix in {sys.prefix, getattr(sys, 'base_prefix', sys.prefix)}:
+        dirs += [os.path.join(prefix, 'nltk_data'),
+                 os.path.join(prefix, 'share', 'nltk_data'),
+                 os.path.join(prefix, 'lib', 'nltk_data')]
+    if sys.platform.startswith('win'):
+        dirs += [os.path.join(os.environ.get('APPDATA', 'C:\\'), 'nltk_data'),
+                 r'C:\nltk_data', r'D:\nltk_data', r'E:\nltk_data']
+    else:
+        dirs += ['/usr/share/nltk_data', '/usr/local/share/nltk_data',
+                 '/usr/lib/nltk_data', '/usr/local/lib/nltk_data']
+    return dirs
+
+def _find_nltk_data(path):
+    # Resources may be installed zipped or unpacked
+    stem = path[:-4] if path.endswith('.zip') else path
+    return any(os.path.exists(os.path.join(d, candidate))
+               for d in _nltk_data_dirs()
+               for candidate in (stem, stem + '.zip'))
+
+def download_resources(names):
+    """Fetch missing NLTK data; spaCy models have to be installed with pip"""
+    import ssl
+    import nltk
+    try:
+        _create_unverified_https_context = ssl._create_unverified_context
+    except AttributeError:
+        pass
+    else:
+        ssl._create_default_https_context = _create_unverified_https_context
+
+    for name in names:
+        if name in NLTK_RESOURCES:
+            nltk.download(name, quiet=True)
+
+registry = ModelRegistry(keyword_idf_path=Config.KEYWORD_IDF_PATH)
+
+def check_resources(download=False):
+    """Warn about missing models and data, downloading NLTK data only when asked"""
+    missing = registry.missing_resources()
+    if missing and download:
+        download_resources(missing)
+        missing = registry.missing_resources()
+    for name in missing:
+        if name in NLTK_RESOURCES:
+            print(f"Missing NLTK data '{name}': run `python -m nltk.downloader {name}`")
+        else:
+            print(f"Missing spaCy model '{name}': run `python -m spacy download {name}`")
+    return missing
+
+def warm_up(freeze_gc=False):
+    return registry.warm_up(freeze_gc=freeze_gc)
@@ -0,0 +1,31 @@
+import hashlib
+from cache import ResultCache
+
+class SentenceMemo:
+    """Per-sentence features keyed by a hash of the sentence text.
+
+    Re-submitted articles (the next page appended, a live blog updated, a
+    typo fixed) mostly repeat sentences already seen, so only the new ones are
+    computed. Entries stay in this process; max_entries=0 turns memoization off.
+
+    Only memoize what follows from the sentence text alone: spaCy's tags and
+    lemmas depend on the surrounding document.
+    """
+
+    def __init__(self, namespace, max_entries=20000):
+        self.cache = ResultCache(namespace, max_entries) if max_entries else None
+
+    def features(self, sentences, compute):
+        """compute(sent) for every sentence, reusing the result for text seen before"""
+        if self.cache is None:
+            return [compute(sent) for sent in sentences]
+        features = []
+        for sent in sentences:
+            # The exact text: whitespace tokens count towards the word total
+            key = hashlib.blake2b(sent.text.encode('utf-8'), digest_size=16).digest()
+            value = self.cache.get(key)
+            if value is None:
+                value = compute(sent)
+                self.cache.set(key, value)
+            features.append(value)
+        return features
@@ -0,0 +1,396 @@
+import contextvars
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import Config
+from cache import ResultCache, DiskTier, content_key, normalize_text
+from admission import AdmissionLimiter
+from article_index import ArticleIndex
+from models.article_analyzer import ANALYSIS_VERSION
+from models.diversity import CandidateRanker
+from get_content_using_url import fetch_page_text, PageFetchError
+from metrics import span, stage_timeouts, upstream_errors
+
+# Skip consent walls and paywall stubs when a fuller candidate is available
+MIN_RELATED_TEXT_CHARS = 500
+
+MAX_RELATED_ARTICLES = 10
+
+class AnalysisPipeline:
+    """Run /api/analyze, overlapping the network stages with the local NLP.
+
+    NewsAPI is queried as soon as the keywords are known while the bias and
+    political analysis continue on the request thread. The top related
+    candidates are then fetched in parallel and the best one goes to GPT.
+    Every network stage has a time budget; a stage that misses it is left
+    out of the response and listed under ``degraded_stages``.
+
+    With an ``article_index``, related articles come from the local index
+    first and NewsAPI only backfills it when too few match. Only NewsAPI
+    results and pages the server fetched itself are added to it: what a
+    client submits is never indexed, since the index is shared with every
+    other user and its URLs are fetched.
+
+    With a ``ranker``, near-duplicate related articles are collapsed and the
+    candidates to compare are the most relevant ones from other sources and
+    leanings; fetched pages that repeat the user's article are skipped.
+
+    With ``admission``, analyses that are not cached wait for one of its
+    slots, or fail fast with ``Overloaded`` when too many are queued. A batch
+    takes a slot per chunk of ``batch_size`` articles; only its first chunk
+    can be turned away.
+    """
+
+    def __init__(self, analyzer, gpt, analysis_cache, related_cache, gpt_cache, executor=None,
+                 article_index=None, ranker=None, admission=None):
+        self.analyzer = analyzer
+        self.gpt = gpt
+        self.analysis_cache = analysis_cache
+        self.related_cache = related_cache
+        self.gpt_cache = gpt_cache
+        self.article_index = article_index
+        self.ranker = ranker
+        self.admission = admission
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=Config.PIPELINE_WORKERS,
+            thread_name_prefix='pipeline'
+        )
+
+    @classmethod
+    def from_config(cls, analyzer, gpt):
+        # A TTL of 0 keeps entries until they are evicted
+        disk_cache = DiskTier(Config.CACHE_PATH, Config.CACHE_DISK_MAX_ENTRIES) if Config.CACHE_PATH else None
+        article_index = ArticleIndex(Config.ARTICLE_INDEX_PATH) if Config.ARTICLE_INDEX_PATH else None
+        ranker = CandidateRanker(
+            analyzer.political_analyzer,
+            ResultCache('signatures', Config.CACHE_MAX_ENTRIES, 0, disk_cache),
+            Config.NEAR_DUPLICATE_THRESHOLD
+        )
+        admission = None
+        if Config.NLP_CONCURRENCY > 0:
+            admission = AdmissionLimiter(Config.NLP_CONCURRENCY, Config.NLP_QUEUE_DEPTH,
+                                         Config.NLP_QUEUE_TIMEOUT)
+        return cls(
+            analyzer, gpt,
+            ResultCache('analysis', Config.CACHE_MAX_ENTRIES, Config.ANALYSIS_CACHE_TTL, disk_cache),
+            ResultCache('related', Config.CACHE_MAX_ENTRIES, Config.RELATED_CACHE_TTL, disk_cache),
+            ResultCache('gpt', Config.CACHE_MAX_ENTRIES, Config.GPT_CACHE_TTL, disk_cache),
+            article_index=article_index,
+            ranker=ranker,
+            admission=admission
+        )
+
+    def run(self, article_text, url=None, sentence_spans=False):
+        """The full response; with sentence_spans it also carries what compact_response needs"""
+        degraded = []
+        analysis, related_articles = self._analyze_with_related(article_text, degraded, url)
+        return self._respond(article_text, analysis, related_articles, degraded, url=url,
+                             sentence_spans=sentence_spans)
+
+    def run_stream(self, article_text, url=None, sentence_spans=False):
+        """Yield the analysis as soon as it is ready, then the GPT comparison piece by piece.
+
+        Events are dicts with an ``event`` of 'analysis', 'gpt_delta' or 'done'.
+        """
+        degraded = []
+        analysis, related_articles = self._analyze_with_related(article_text, degraded, url)
+        yield {'event': 'analysis',
+               **self._respond(article_text, analysis, related_articles, degraded, compare=False,
+                               sentence_spans=sentence_spans)}
+
+        if len(related_articles) > 0:
+            compare_key, result, content = self._prepare_compare(
+                article_text, analysis, related_articles, degraded, url
+            )
+            if result is not None:
+                yield {'event': 'gpt_delta', 'text': result}
+            elif content is not None:
+                pieces = []
+                try:
+                    for piece in self.gpt.compare_articles_stream(article_text, content):
+                        pieces.append(piece)
+                        yield {'event': 'gpt_delta', 'text': piece}
+                except Exception as e:
+                    print(f"Error comparing articles: {e}")
+                    upstream_errors.inc(service='openai')
+                    degraded.append('gpt_compare')
+                else:
+                    self.gpt_cache.set(compare_key, ''.join(pieces).strip())
+
+        yield {'event': 'done', 'degraded_stages': degraded}
+
+    def run_local(self, article_text, sentence_spans=False):
+        """Only the local NLP, for the async job mode.
+
+        Returns the response without related articles or comparison, and the
+        analysis to pass to ``complete`` later.
+        """
+        text_key = _analysis_key(article_text)
+        analysis = self.analysis_cache.get(text_key)
+        if analysis is None:
+            analysis = self._analyze(article_text)
+            self.analysis_cache.set(text_key, analysis)
+        response = self._respond(article_text, analysis, [], [], compare=False, sentence_spans=sentence_spans)
+        del response['related_articles'], response['GPT_Compare']
+        return response, analysis
+
+    def _analyze_with_related(self, article_text, degraded, url=None):
+        related = {}
+
+        def start_related(keywords):
+            related['deadline'] = time.monotonic() + Config.RELATED_TIMEOUT
+            related['future'] = self._submit(self._find_related_articles, keywords, url)
+
+        text_key = _analysis_key(article_text)
+        analysis = self.analysis_cache.get(text_key)
+        if analysis is None:
+            analysis = self._analyze(article_text, on_keywords=start_related)
+            self.analysis_cache.set(text_key, analysis)
+        else:
+            start_related(analysis['keywords'])
+
+        try:
+            related_articles = related['future'].result(timeout=_remaining(related['deadline']))
+        except TimeoutError:
+            print("Related article lookup timed out")
+            stage_timeouts.inc(stage='related_articles')
+            degraded.append('related_articles')
+            related_articles = []
+
+        return analysis, self._collapse(article_text, related_articles)
+
+    def _analyze(self, article_text, on_keywords=None):
+        # Analyses are cached under content_key, so they are made from the text
+        # it hashes; sentence_spans are offsets into that normalized text
+        article_text = normalize_text(article_text)
+        if self.admission is None:
+            return self.analyzer.analyze_article(article_text, on_keywords)
+        with self.admission.slot():
+            return self.analyzer.analyze_article(article_text, on_keywords)
+
+    def run_batch(self, texts, batch_size=32, n_process=1, include_related=False, include_compare=False):
+        """Yield one response per text, in input order, as soon as each is ready.
+
+        The NLP goes through ArticleAnalyzer.analyze_articles. The related
+        article and GPT stages are opt-in and run for several articles at once.
+        An article that fails gets ``{'status': 'error', 'error': message}``
+        and the rest of the batch carries on.
+        """
+        analyses = self._batch_analyses(texts, batch_size, n_process)
+        if not include_related:
+            for text, analysis in zip(texts, analyses):
+                if 'error' in analysis:
+                    yield analysis
+                else:
+                    yield self._respond(text, analysis, [], [], compare=False)
+            return
+
+        window = Config.BATCH_NETWORK_WORKERS
+        with ThreadPoolExecutor(max_workers=window, thread_name_prefix='batch') as items:
+            pending = deque()
+            for text, analysis in zip(texts, analyses):
+                pending.append(items.submit(self._complete_batch_item, text, analysis, include_compare))
+                while pending and (pending[0].done() or len(pending) > 2 * window):
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _batch_analyses(self, texts, batch_size, n_process):
+        keys = [_analysis_key(text) for text in texts]
+        cached = [self.analysis_cache.get(key) for key in keys]
+        fresh = self._analyze_batches(
+            [normalize_text(text) for text, analysis in zip(texts, cached) if analysis is None],
+            batch_size, n_process
+        )
+        for key, analysis in zip(keys, cached):
+            if analysis is None:
+                analysis = next(fresh)
+                if 'error' not in analysis:
+                    self.analysis_cache.set(key, analysis)
+            yield analysis
+        # Lets analyze_articles shut its worker pool down
+        fresh.close()
+
+    def _analyze_batches(self, texts, batch_size, n_process):
+        if self.admission is None:
+            yield from self.analyzer.analyze_articles(texts, batch_size, n_process)
+            return
+        # Each chunk holds one slot while its NLP runs, like a single analysis;
+        # the slot is free again before its results go on to the network stages.
+        # Only the first chunk can be turned away: once it is admitted the
+        # response has started, so later chunks wait their turn
+        step = batch_size * max(n_process, 1)
+        for start in range(0, len(texts), step):
+            with self.admission.slot(wait=start > 0):
+                analyses = list(self.analyzer.analyze_articles(texts[start:start + step], batch_size, n_process))
+            yield from analyses
+
+    def _complete_batch_item(self, article_text, analysis, include_compare):
+        if 'error' in analysis:
+            return analysis
+        try:
+            return self.complete(article_text, analysis, include_compare)
+        except Exception as e:
+            print(f"Error completing article in batch: {e}")
+            return {'status': 'error', 'error': str(e)}
+
+    def complete(self, article_text, analysis, include_compare=True, url=None, sentence_spans=False):
+        """The network stages for an analysis: related articles and, optionally, the GPT comparison"""
+        related_articles = self._collapse(
+            article_text, self._find_related_articles(analysis['keywords'], url)
+        )
+        return self._respond(article_text, analysis, related_articles, [], include_compare, url,
+                             sentence_spans)
+
+    def _respond(self, article_text, analysis, related_articles, degraded, compare=True, url=None,
+                 sentence_spans=False):
+        response = {
+            'status': 'success',
+            'analysis': analysis['bias_analysis'],
+            'keywords': analysis['keywords'],
+            'political_analysis': analysis['political_analysis'],
+            'related_articles': related_articles,
+            'GPT_Compare': ''
+        }
+
+        if compare and len(related_articles) > 0:
+            response['GPT_Compare'] = self._compare(article_text, analysis, related_articles, degraded, url)
+
+        if degraded:
+            response['degraded_stages'] = degraded
+        if 'analysis_mode' in analysis:
+            response['analysis_mode'] = analysis['analysis_mode']
+        # Offsets into normalize_text(article_text), which compact_response maps back onto article_text.
+        # Analyses cached before offsets were recorded have none; compact_response then searches the text
+        if sentence_spans and 'sentence_spans' in analysis:
+            response['sentence_spans'] = analysis['sentence_spans']
+
+        return response
+
+    def _find_related_articles(self, keywords, exclude_url=None):
+        keywords_key = content_key(*keywords)
+        related_articles = self.related_cache.get(keywords_key)
+        if related_articles is None:
+            related_articles = self._lookup_related(keywords)
+            # An empty list may be a transient NewsAPI failure, so don't keep it
+            if related_articles:
+                self.related_cache.set(keywords_key, related_articles)
+        if exclude_url:
+            related_articles = [article for article in related_articles if article.get('url') != exclude_url]
+        return related_articles
+
+    def _lookup_related(self, keywords):
+        local = []
+        if self.article_index is not None:
+            try:
+                with span('index_search'):
+                    local = self.article_index.search(keywords, MAX_RELATED_ARTICLES)
+            except sqlite3.Error as e:
+                print(f"Error searching article index: {e}")
+            if len(local) >= Config.RELATED_INDEX_MIN_RESULTS:
+                return local
+
+        # Too few local matches: ask NewsAPI and keep what it returns for next time
+        remote = self.analyzer.find_related_articles(keywords, MAX_RELATED_ARTICLES)
+        if remote:
+            self._index_many(remote)
+        seen = {article.get('url') for article in remote}
+        return (remote + [article for article in local if article.get('url') not in seen])[:MAX_RELATED_ARTICLES]
+
+    def _index(self, article, body=None):
+        if self.article_index is not None:
+            try:
+                self.article_index.add(article, body)
+            except sqlite3.Error as e:
+                print(f"Error indexing article: {e}")
+
+    def _index_many(self, articles, bodies=None):
+        if self.article_index is not None:
+            try:
+                self.article_index.add_many(articles, bodies)
+            except sqlite3.Error as e:
+                print(f"Error indexing articles: {e}")
+
+    def _collapse(self, article_text, related_articles):
+        if self.ranker is None:
+            return related_articles
+        return self.ranker.collapse(article_text, related_articles)
+
+    def _compare(self, article_text, analysis, related_articles, degraded, url=None):
+        compare_key, result, content = self._prepare_compare(
+            article_text, analysis, related_articles, degraded, url
+        )
+        if result is not None:
+            return result
+        if content is None:
+            return ''
+
+        future = self._submit(self.gpt.compare_articles, article_text, content)
+        try:
+            result = future.result(timeout=Config.GPT_TIMEOUT)
+        except TimeoutError:
+            print("GPT comparison timed out")
+            stage_timeouts.inc(stage='gpt_compare')
+            degraded.append('gpt_compare')
+            return ''
+        except Exception as e:
+            print(f"Error comparing articles: {e}")
+            upstream_errors.inc(service='openai')
+            degraded.append('gpt_compare')
+            return ''
+
+        self.gpt_cache.set(compare_key, result)
+        return result
+
+    def _prepare_compare(self, article_text, analysis, related_articles, degraded, url=None):
+        """Return the cache key and either the cached comparison or the text to compare against"""
+        if self.ranker is not None:
+            related_articles = self.ranker.rank(related_articles, analysis['political_analysis'], url)
+        candidates = related_articles[:Config.RELATED_CANDIDATES]
+        compare_key = content_key(article_text, *(article['url'] for article in candidates))
+        result = self.gpt_cache.get(compare_key)
+        if result is not None:
+            return compare_key, result, None
+        return compare_key, None, self._best_candidate_text(article_text, candidates, degraded)
+
+    def _best_candidate_text(self, article_text, candidates, degraded):
+        futures = [
+            self._submit(fetch_page_text, article['url'])
+            for article in candidates
+        ]
+        deadline = time.monotonic() + Config.FETCH_TIMEOUT
+
+        # Keep the candidates' order, preferring pages with real content
+        texts = []
+        for article, future in zip(candidates, futures):
+            try:
+                text = future.result(timeout=_remaining(deadline))
+            except TimeoutError:
+                stage_timeouts.inc(stage='related_fetch')
+                if 'related_fetch' not in degraded:
+                    degraded.append('related_fetch')
+                continue
+            except PageFetchError as e:
+                print(f"Error fetching related article: {e}")
+                upstream_errors.inc(service='page')
+                continue
+            self._index(article, text)
+            if self.ranker is not None and self.ranker.duplicates_article(article_text, text):
+                continue
+            if len(text) >= MIN_RELATED_TEXT_CHARS:
+                return text
+            texts.append(text)
+
+        return max(texts, key=len) if texts else None
+
+    def _submit(self, func, *args):
+        # Run in a copy of the caller's context so spans land in the request's Server-Timing
+        return self.executor.submit(contextvars.copy_context().run, func, *args)
+
+def _remaining(deadline):
+    return max(deadline - time.monotonic(), 0)
+
+def _analysis_key(article_text):
+    # Analyses cached by an older version of the analyzer are never served
+    return content_key(f'v{ANALYSIS_VERSION}', article_text)
@@ -0,0 +1,220 @@
+"""The compact response format, fast JSON encoding and Accept-Encoding compression.
+
+``?format=compact`` replaces the sentence texts in the analysis with a
+sentence table of offsets into the submitted ``article_text``; the bias
+indicator categories and emotional language refer to it by index, and related
+articles keep only the fields the extension shows.
+"""
+import gzip
+import json
+import unicodedata
+import zlib
+from bisect import bisect_left
+import numpy as np
+from flask import Response, request
+from cache import normalize_text
+from config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RELATED_FIELDS = ('title', 'url', 'publishedAt')
+
+GZIP_LEVEL = 6
+# Brotli's default (11) is far too slow to run per response
+BROTLI_QUALITY = 5
+
+def wants_compact():
+    return request.args.get('format') == 'compact'
+
+def compact_response(response, article_text):
+    """Convert a pipeline response, run with sentence_spans, to the compact schema"""
+    analysis = response['analysis']
+    indicators = analysis['bias_indicators']
+    emotional = analysis['emotional_language']
+
+    sentence_spans = response.get('sentence_spans')
+    # The cached analysis may come from a text that differs from this one in
+    # whitespace or line endings, so its offsets are into normalize_text
+    to_submitted = _submitted_offsets(article_text) if sentence_spans is not None else None
+    if to_submitted is not None:
+        # Offsets the parser gave each sentence; JSON from the disk cache turns them into lists
+        located = {category: [_span(offsets, to_submitted) for offsets in found]
+                   for category, found in sentence_spans['bias_indicators'].items()}
+        emotional_spans = [_span(offsets, to_submitted) for offsets in sentence_spans['emotional_language']]
+    else:
+        # Each list is in document order, so one forward scan per list finds its sentences
+        located = {category: _locate(article_text, sentences) for category, sentences in indicators.items()}
+        emotional_spans = _locate(article_text, [item['text'] for item in emotional])
+
+    spans = sorted({span for found in located.values() for span in found if span}
+                   | {span for span in emotional_spans if span})
+    index = {span: i for i, span in enumerate(spans)}
+    to_utf16 = _utf16_offsets(article_text)
+
+    compact = {
+        'status': response['status'],
+        'format': 'compact',
+        # JavaScript string offsets (UTF-16 code units) into article_text, end exclusive
+        'sentences': [[to_utf16(start), to_utf16(end)] for start, end in spans],
+        'analysis': {
+            'sentiment_scores': {name: float(value) for name, value in analysis['sentiment_scores'].items()},
+            'subjectivity_score': float(analysis['subjectivity_score']),
+            'overall_bias_score': float(analysis['overall_bias_score']),
+            'bias_indicators': {
+                category: [index[span] for span in found if span]
+                for category, found in located.items()
+            },
+            'emotional_language': [
+                {'sentence': index[span], 'intensity': float(item['intensity'])}
+                for item, span in zip(emotional, emotional_spans) if span
+            ]
+        },
+        'keywords': response['keywords'],
+        'political_analysis': response['political_analysis']
+    }
+    if 'related_articles' in response:
+        compact['related_articles'] = [_trim_article(article) for article in response['related_articles']]
+    for key in ('GPT_Compare', 'degraded_stages', 'analysis_mode'):
+        if key in response:
+            compact[key] = response[key]
+    return compact
+
+def _span(offsets, to_submitted):
+    return (to_submitted(offsets[0]), to_submitted(offsets[1])) if offsets else None
+
+def _submitted_offsets(text):
+    """Map offsets into normalize_text(text) back onto text, or None when they cannot be"""
+    body = text.strip()
+    lead = len(text) - len(text.lstrip())
+    if unicodedata.is_normalized('NFC', body):
+        # Each CRLF is one character shorter once normalized
+        crlf = [i - n for n, i in enumerate(_find_all(body, '\r\n'))]
+        if not crlf:
+            return lambda offset: offset + lead
+        return lambda offset: offset + lead + bisect_left(crlf, offset)
+
+    # Compose each run of a starter and its combining marks on its own, noting
+    # where every normalized character came from
+    positions = []
+    pieces = []
+    start = 0
+    while start < len(body):
+        end = start + 1
+        if body.startswith('\r\n', start):
+            piece = '\n'
+            end = start + 2
+        else:
+            while end < len(body) and unicodedata.combining(body[end]):
+                end += 1
+            piece = unicodedata.normalize('NFC', body[start:end])
+        positions.extend([start] * len(piece))
+        pieces.append(piece)
+        start = end
+    positions.append(len(body))
+    # Compositions across starters (Hangul jamo) cannot be mapped this way
+    if ''.join(pieces) != normalize_text(text):
+        return None
+    return lambda offset: positions[offset] + lead
+
+def _find_all(text, sub):
+    i = text.find(sub)
+    while i >= 0:
+        yield i
+        i = text.find(sub, i + len(sub))
+
+def _locate(text, sentences):
+    """(start, end) of each stripped sentence in text, searching forward from the previous one"""
+    spans = []
+    cursor = 0
+    for sentence in sentences:
+        sentence = sentence.strip()
+        start = text.find(sentence, cursor) if sentence else -1
+        if start < 0:
+            spans.append(None)
+            continue
+        cursor = start + len(sentence)
+        spans.append((start, cursor))
+    return spans
+
+def _utf16_offsets(text):
+    # Characters outside the BMP are two UTF-16 code units in JavaScript strings
+    if text.isascii():
+        return lambda offset: offset
+    astral = [i for i, char in enumerate(text) if ord(char) > 0xFFFF]
+    if not astral:
+        return lambda offset: offset
+    return lambda offset: offset + bisect_left(astral, offset)
+
+def _trim_article(article):
+    trimmed = {field: article.get(field) for field in RELATED_FIELDS}
+    trimmed['source'] = (article.get('source') or {}).get('name')
+    return trimmed
+
+def dumps(payload):
+    """JSON bytes; orjson when it is installed, which also takes NumPy scalars and arrays"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_to_builtin, separators=(',', ':')).encode('utf-8')
+
+def _to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def negotiate_encoding():
+    """'br', 'gzip' or None, from the request's Accept-Encoding"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def json_response(payload, status=200):
+    body = dumps(payload)
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding() if len(body) >= Config.COMPRESS_MIN_BYTES else None
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, GZIP_LEVEL))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def stream_response(chunks, mimetype):
+    """Stream chunks (str), compressed per Accept-Encoding and flushed after each one"""
+    encoding = negotiate_encoding()
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        encoded = (compressor.process(chunk.encode('utf-8')) + compressor.flush() for chunk in chunks)
+        encoded = _finish(encoded, compressor.finish)
+    elif encoding == 'gzip':
+        # wbits 31 writes the gzip header and trailer
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        encoded = (compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                   for chunk in chunks)
+        encoded = _finish(encoded, compressor.flush)
+    else:
+        encoded = chunks
+
+    response = Response(encoded, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def _finish(encoded, finish):
+    yield from encoded
+    yield finish()
@@ -0,0 +1,23 @@
+import os
+import sqlite3
+import threading
+
+class LocalConnection:
+    """Callable that returns this thread's connection to an SQLite file.
+
+    A connection must not cross a fork (gunicorn's preload_app), so a child
+    process opens its own on first use.
+    """
+
+    def __init__(self, path, **connect_kwargs):
+        self.path = path
+        self.connect_kwargs = {'timeout': 5, **connect_kwargs}
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, **self.connect_kwargs)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app refuses to start without keys; nothing here calls NewsAPI or OpenAI
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ.setdefault('NEWS_API_KEY', 'test')
+
+@pytest.fixture
+def installed_models():
+    """Skip, when the test runs rather than at collection, unless the spaCy model and NLTK data are installed"""
+    from models.registry import registry
+    missing = registry.missing_resources()
+    if missing:
+        pytest.skip(f"needs {', '.join(missing)} installed")
+
+@pytest.fixture
+def trained_pipeline(installed_models):
+    from models.registry import registry
+    if not registry.nlp.meta.get('performance'):
+        pytest.skip('needs a trained spaCy pipeline; scores from an untrained one are noise')
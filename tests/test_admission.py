@@ -0,0 +1,73 @@
+import threading
+import time
+import pytest
+import metrics
+from admission import AdmissionLimiter, Overloaded
+from cache import ResultCache
+from pipeline import AnalysisPipeline
+
+class CountingAnalyzer:
+    """Stands in for ArticleAnalyzer, noting how many slots are taken while each batch is parsed"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.running = []
+
+    def analyze_articles(self, texts, batch_size=32, n_process=1):
+        for text in texts:
+            self.running.append(self.limiter.running)
+            yield {'bias_analysis': {}, 'keywords': [], 'political_analysis': {}}
+
+def batch_pipeline(limiter):
+    return AnalysisPipeline(CountingAnalyzer(limiter), None, ResultCache('analysis', 0),
+                            ResultCache('related', 0), ResultCache('gpt', 0), admission=limiter)
+
+def test_rejections_are_exposed_in_metrics():
+    limiter = AdmissionLimiter(limit=1, max_queue=0, queue_timeout=1)
+    with limiter.slot():
+        with pytest.raises(Overloaded) as rejected:
+            with limiter.slot():
+                pass
+    assert rejected.value.retry_after >= 1
+
+    exposed = metrics.expose()
+    assert 'newsperspective_admission_rejections_total' in exposed
+    assert 'newsperspective_admission_rejections_total{reason="queue_full"}' in exposed
+
+def test_batches_take_a_slot_per_chunk():
+    limiter = AdmissionLimiter(limit=1, max_queue=0, queue_timeout=1)
+    pipeline = batch_pipeline(limiter)
+    results = pipeline.run_batch([f'Article {i}.' for i in range(5)], batch_size=2)
+    first = next(results)
+    # The chunk's slot is released before its results are handed on
+    assert limiter.running == 0
+    assert len([first, *results]) == 5
+    assert pipeline.analyzer.running == [1] * 5
+
+def test_batch_is_turned_away_when_the_slots_are_taken():
+    limiter = AdmissionLimiter(limit=1, max_queue=0, queue_timeout=1)
+    pipeline = batch_pipeline(limiter)
+    with limiter.slot():
+        with pytest.raises(Overloaded):
+            next(pipeline.run_batch(['An article.'], batch_size=2))
+    assert pipeline.analyzer.running == []
+
+def test_an_admitted_batch_waits_for_later_chunks_instead_of_failing():
+    limiter = AdmissionLimiter(limit=1, max_queue=0, queue_timeout=1)
+    pipeline = batch_pipeline(limiter)
+    results = pipeline.run_batch([f'Article {i}.' for i in range(6)], batch_size=2)
+    first = next(results)
+
+    # Another request holds the only slot when the second chunk asks for it
+    held = threading.Event()
+
+    def other_request():
+        with limiter.slot():
+            held.set()
+            time.sleep(0.2)
+
+    thread = threading.Thread(target=other_request)
+    thread.start()
+    held.wait()
+    assert len([first, *results]) == 6
+    thread.join()
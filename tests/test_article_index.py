@@ -0,0 +1,22 @@
+from article_index import ArticleIndex
+
+def newsapi_article(url, title):
+    return {'source': {'id': None, 'name': 'Example'}, 'author': None, 'title': title,
+            'description': 'The council approved the transit budget on Monday.', 'url': url,
+            'publishedAt': None}
+
+def test_only_public_http_urls_are_indexed(tmp_path):
+    index = ArticleIndex(str(tmp_path / 'index.db'))
+    index.add_many([
+        newsapi_article('https://news.example.com/transit-budget', 'Council approves transit budget'),
+        newsapi_article('http://127.0.0.1:8080/admin', 'Council transit budget leak'),
+        newsapi_article('http://169.254.169.254/latest/meta-data', 'Council transit budget metadata'),
+        newsapi_article('http://localhost/transit', 'Council transit budget local'),
+        newsapi_article('file:///etc/passwd', 'Council transit budget file')
+    ])
+    index.add(newsapi_article('http://[::1]/budget', 'Council transit budget loopback'))
+
+    assert len(index) == 1
+    assert [article['url'] for article in index.search(['council', 'transit budget'])] == [
+        'https://news.example.com/transit-budget'
+    ]
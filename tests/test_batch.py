@@ -0,0 +1,37 @@
+import spacy
+from cache import ResultCache
+from models.article_analyzer import ArticleAnalyzer
+from models.registry import registry
+from pipeline import AnalysisPipeline, _analysis_key
+
+def batch_pipeline(analyzer):
+    return AnalysisPipeline(analyzer, None, ResultCache('analysis'), ResultCache('related'), ResultCache('gpt'))
+
+def test_a_failing_article_does_not_end_the_batch(monkeypatch):
+    nlp = spacy.blank('en')
+    monkeypatch.setattr(type(registry), 'nlp', property(lambda self: nlp))
+
+    def analyze_context(self, context, on_keywords=None):
+        if context.text == 'the and of':
+            raise ValueError('empty vocabulary; perhaps the documents only contain stop words')
+        return {'bias_analysis': {'overall_bias_score': len(context.text)}, 'keywords': [],
+                'political_analysis': {}}
+
+    monkeypatch.setattr(ArticleAnalyzer, '_analyze_context', analyze_context)
+    pipeline = batch_pipeline(ArticleAnalyzer('test'))
+    texts = ['The council met.', 'the and of', 'The vote passed.']
+    results = list(pipeline.run_batch(texts, batch_size=2))
+
+    assert [result['status'] for result in results] == ['success', 'error', 'success']
+    assert 'empty vocabulary' in results[1]['error']
+    assert results[2]['analysis'] == {'overall_bias_score': len(texts[2])}
+    # Failures are not cached, so a retry analyzes the article again
+    assert pipeline.analysis_cache.get(_analysis_key('the and of')) is None
+
+def test_stop_words_only_article_is_reported_in_place(installed_models):
+    pipeline = batch_pipeline(ArticleAnalyzer('test'))
+    texts = ['The council approved the budget after a long debate on Monday.', 'the and of',
+             'Critics said the new transit plan was a wonderful idea for the city.']
+    results = list(pipeline.run_batch(texts, batch_size=2))
+
+    assert [result['status'] for result in results] == ['success', 'error', 'success']
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import time
+import pipeline
+from cache import DiskTier, ResultCache
+from pipeline import AnalysisPipeline
+
+def test_purge_keeps_the_newest_rows_of_each_namespace(tmp_path):
+    disk = DiskTier(str(tmp_path / 'cache.db'), max_entries=3)
+    for i in range(10):
+        disk.set('analysis', f'key{i}', i)
+    disk.set('gpt', 'only', 'answer')
+    # Rewriting a key makes it the newest
+    disk.set('analysis', 'key0', 0)
+    disk.purge()
+
+    rows = sqlite3.connect(disk.path).execute('SELECT namespace, key FROM cache ORDER BY rowid').fetchall()
+    assert rows == [('analysis', 'key8'), ('analysis', 'key9'), ('gpt', 'only'), ('analysis', 'key0')]
+
+def test_disk_hit_keeps_the_rows_remaining_ttl(tmp_path):
+    disk = DiskTier(str(tmp_path / 'cache.db'))
+    writer = ResultCache('related', ttl=0.2, disk=disk)
+    writer.set('key', 'value')
+    time.sleep(0.15)
+
+    reader = ResultCache('related', ttl=0.2, disk=disk)
+    assert reader.get('key') == 'value'
+    time.sleep(0.1)
+    # A fresh full TTL would still hold the value in memory here
+    assert reader.get('key') is None
+
+def test_forked_child_opens_its_own_connection(tmp_path):
+    disk = DiskTier(str(tmp_path / 'cache.db'))
+    parent_conn = disk._connection()
+    pid = os.fork()
+    if pid == 0:
+        # Exit status 0 only if the child got a connection of its own that works
+        status = 1
+        try:
+            if disk._connection() is not parent_conn:
+                disk.set('analysis', 'child', 'value')
+                status = 0
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert disk._connection() is parent_conn
+    assert disk.get('analysis', 'child') == 'value'
+
+class CountingAnalyzer:
+    def __init__(self):
+        self.calls = 0
+
+    def analyze_article(self, text, on_keywords=None):
+        self.calls += 1
+        return {'bias_analysis': {}, 'keywords': [], 'political_analysis': {}}
+
+def test_a_new_analysis_version_misses_the_disk_cache(tmp_path, monkeypatch):
+    disk = DiskTier(str(tmp_path / 'cache.db'))
+    analyzer = CountingAnalyzer()
+
+    def run(text):
+        # A fresh pipeline each time, as after a deploy: only the disk tier remains
+        analysis_pipeline = AnalysisPipeline(analyzer, None, ResultCache('analysis', disk=disk),
+                                             ResultCache('related'), ResultCache('gpt'))
+        analysis_pipeline.run_local(text)
+
+    run('The council met on Monday.')
+    run('The council met on Monday.')
+    assert analyzer.calls == 1
+
+    monkeypatch.setattr(pipeline, 'ANALYSIS_VERSION', pipeline.ANALYSIS_VERSION + 1)
+    run('The council met on Monday.')
+    assert analyzer.calls == 2
@@ -0,0 +1,86 @@
+import json
+import pytest
+from benchmarks.corpus import load_corpus
+from config import Config
+from models.article_analyzer import ArticleAnalyzer
+from models.chunking import split_chunks
+from models.registry import registry
+
+def canonical(analysis):
+    # Sets make the order of some lists arbitrary; compare them sorted
+    political = analysis['political_analysis']
+    for side in political['evidence']:
+        political['evidence'][side].sort()
+    return json.loads(json.dumps(analysis, sort_keys=True, default=float))
+
+def mid_sized_article(chars=60000):
+    text = '\n\n'.join(text for _, text in load_corpus(10))
+    return text[:text.rfind('\n\n', 0, chars)]
+
+def indicator_count(bias_analysis):
+    return sum(len(sentences) for sentences in bias_analysis['bias_indicators'].values())
+
+class PresplitNlp:
+    """Stands in for registry.nlp, handing out docs that were already parsed"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def pipe(self, texts, **kwargs):
+        return iter(self.docs)
+
+def test_split_chunks_rejoin_at_paragraphs():
+    text = mid_sized_article()
+    chunks = split_chunks(text, 20000)
+    assert ''.join(chunks) == text
+    assert all(len(chunk) <= 20000 for chunk in chunks)
+    assert all(chunk.endswith('\n\n') for chunk in chunks[:-1])
+
+def test_chunks_merge_to_the_whole_document_result(monkeypatch, installed_models):
+    # Chunks cut from the whole parse carry the same annotations, so any
+    # difference would come from merging the per-chunk results
+    analyzer = ArticleAnalyzer('test')
+    text = mid_sized_article()
+    assert len(text) <= Config.CHUNKED_ANALYSIS_CHARS
+    whole = analyzer.analyze_article(text)
+
+    doc = registry.nlp(text, disable=analyzer.disabled_components)
+    starts = [sent.start for sent in list(doc.sents)[::25]] + [len(doc)]
+    docs = [doc[start:end].as_doc() for start, end in zip(starts, starts[1:])]
+    monkeypatch.setattr(type(registry), 'nlp', property(lambda self: PresplitNlp(docs)))
+    chunked = analyzer.analyze_long_article(text)
+
+    assert chunked.pop('analysis_mode') == 'chunked'
+    assert canonical(chunked) == canonical(whole)
+
+def test_chunked_analysis_stays_close_to_a_single_parse(monkeypatch, trained_pipeline):
+    analyzer = ArticleAnalyzer('test')
+    text = mid_sized_article()
+    whole = analyzer.analyze_article(text)
+    monkeypatch.setattr(Config, 'ANALYSIS_CHUNK_CHARS', 20000)
+    chunked = analyzer.analyze_long_article(text)
+
+    whole_bias, chunked_bias = whole['bias_analysis'], chunked['bias_analysis']
+    assert chunked_bias['sentiment_scores']['compound'] == pytest.approx(
+        whole_bias['sentiment_scores']['compound'], abs=0.05)
+    assert chunked_bias['subjectivity_score'] == pytest.approx(whole_bias['subjectivity_score'], abs=0.01)
+    assert chunked_bias['overall_bias_score'] == pytest.approx(whole_bias['overall_bias_score'], abs=0.1)
+    assert indicator_count(chunked_bias) == pytest.approx(indicator_count(whole_bias), rel=0.1)
+    assert len(chunked_bias['emotional_language']) == pytest.approx(len(whole_bias['emotional_language']), rel=0.1)
+    # score_keywords keeps the top 5
+    assert len(set(chunked['keywords']) & set(whole['keywords'])) >= 3
+    # Phrases running across a cut are matched on their own, so the cuts lose none
+    assert canonical(chunked)['political_analysis'] == canonical(whole)['political_analysis']
+
+def test_partisan_phrase_across_a_cut_still_counts(monkeypatch, installed_models):
+    # No line breaks or sentence ends, so the chunk is cut at the space inside "tax cuts"
+    text = ('the council spent the evening on the budget and most members said they wanted '
+            'tax cuts for working families before the end of the year and nothing more')
+    monkeypatch.setattr(Config, 'ANALYSIS_CHUNK_CHARS', text.index('tax cuts') + len('tax '))
+    analyzer = ArticleAnalyzer('test')
+    assert split_chunks(text, Config.ANALYSIS_CHUNK_CHARS)[0].endswith('tax ')
+
+    whole = analyzer.analyze_article(text)
+    chunked = analyzer.analyze_long_article(text)
+    assert 'tax cuts' in whole['political_analysis']['evidence']['right_indicators']
+    assert canonical(chunked)['political_analysis'] == canonical(whole)['political_analysis']
@@ -0,0 +1,27 @@
+from models.diversity import CandidateRanker
+
+ARTICLE = ' '.join(f"Paragraph {i} of the council budget story covers road repairs, "
+                   f"school funding and the vote scheduled for week {i}." for i in range(200))
+
+class NeutralAnalyzer:
+    def analyze_political_leaning(self, text):
+        return {'left_percentage': 0, 'right_percentage': 0}
+
+def candidate(url, title, description):
+    return {'url': url, 'title': title, 'description': description, 'content': None,
+            'source': {'name': url}}
+
+def test_collapse_drops_only_summaries_copied_from_the_article():
+    ranker = CandidateRanker(NeutralAnalyzer())
+    copied = ARTICLE[:300]
+    quoting = ("Opposition members said the plan ignores transit entirely. "
+               "Paragraph 3 of the council budget story covers road repairs, they noted, "
+               "before asking for an audit of the city's spending since last spring.")
+    kept = ranker.collapse(ARTICLE, [candidate('a', 'Budget', copied), candidate('b', 'Reaction', quoting)])
+    assert [article['url'] for article in kept] == ['b']
+
+def test_page_that_contains_the_article_is_a_duplicate():
+    ranker = CandidateRanker(NeutralAnalyzer())
+    page = 'Subscribe for more local news. ' + ARTICLE + ' Comments are closed.'
+    assert ranker.duplicates_article(ARTICLE, page)
+    assert not ranker.duplicates_article(ARTICLE, 'An unrelated story about the harbour festival ' * 30)
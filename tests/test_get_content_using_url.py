@@ -0,0 +1,60 @@
+import pytest
+import get_content_using_url
+from get_content_using_url import PageFetchError, _extract_text, fetch_page_text, is_public_url
+
+class PageResponse:
+    """Just what _extract_text reads from a requests response"""
+
+    def __init__(self, body):
+        self.body = body.encode('utf-8')
+        self.headers = {'Content-Type': 'text/html'}
+        self.encoding = None
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+def test_extract_text_prefers_the_article_over_boilerplate():
+    story = 'The council approved the budget after a long debate. ' * 5
+    page = f'<html><nav>Home | World</nav><article><p>{story}</p></article><footer>About</footer></html>'
+    assert _extract_text(PageResponse(page)) == story.strip()
+
+def test_malformed_markup_is_a_fetch_error():
+    with pytest.raises(PageFetchError):
+        _extract_text(PageResponse('<html><p>Story</p><![foo[ bar ]]></html>'))
+
+def test_private_hosts_are_not_public():
+    assert is_public_url('https://93.184.216.34/story', resolve=False)
+    assert is_public_url('https://news.example.com/story', resolve=False)
+    for url in ('http://127.0.0.1/', 'http://localhost:8000/', 'http://10.0.0.5/', 'http://[::1]/',
+                'http://169.254.169.254/latest/meta-data', 'http://db.internal/', 'ftp://example.com/',
+                'http://example.com:notaport/'):
+        assert not is_public_url(url, resolve=False), url
+
+class RedirectSession:
+    """Answers every GET with a redirect to a loopback address"""
+
+    def __init__(self):
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        return RedirectResponse('http://127.0.0.1:9000/admin')
+
+class RedirectResponse:
+    is_redirect = True
+
+    def __init__(self, location):
+        self.headers = {'Location': location}
+
+    def close(self):
+        pass
+
+def test_redirects_to_private_hosts_are_not_followed(monkeypatch):
+    session = RedirectSession()
+    monkeypatch.setattr(get_content_using_url, '_session', session)
+    monkeypatch.setattr(get_content_using_url, 'is_public_url',
+                        lambda url, resolve=True: is_public_url(url, resolve=False))
+    with pytest.raises(PageFetchError):
+        fetch_page_text('https://news.example.com/story')
+    assert session.requested == ['https://news.example.com/story']
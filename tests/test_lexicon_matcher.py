@@ -0,0 +1,31 @@
+import spacy
+from models.lexicon_matcher import LexiconMatcher
+
+def test_single_words_match_their_inflected_forms():
+    nlp = spacy.blank('en')
+    matcher = LexiconMatcher(nlp, {
+        'opinion': {'believe', 'seem', 'suggest', 'think'},
+        'loaded': {'progressive', 'liberal'},
+        'phrases': ['tax cuts']
+    })
+    doc = nlp('She believes the plan seems flawed. Experts suggested changes and thought '
+              'Progressives and liberals backed tax cuts but not tax cut.')
+    hits = {(match.category, match.phrase, doc[match.start:match.end].text) for match in matcher.find(doc)}
+    assert hits == {
+        ('opinion', 'believe', 'believes'), ('opinion', 'seem', 'seems'),
+        ('opinion', 'suggest', 'suggested'), ('opinion', 'think', 'thought'),
+        ('loaded', 'progressive', 'Progressives'), ('loaded', 'liberal', 'liberals'),
+        ('phrases', 'tax cuts', 'tax cuts')
+    }
+
+def test_words_do_not_match_inside_longer_words():
+    nlp = spacy.blank('en')
+    matcher = LexiconMatcher(nlp, {
+        'extreme': {'all', 'never', 'every'},
+        'hedging': {'may'}
+    })
+    doc = nlp('The Mayor rallied support for the ballot; nevertheless everyone waited.')
+    assert matcher.find(doc) == []
+
+    doc = nlp('All of it may never happen.')
+    assert {match.phrase for match in matcher.find(doc)} == {'all', 'may', 'never'}
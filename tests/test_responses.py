@@ -0,0 +1,69 @@
+from cache import ResultCache
+from models.article_analyzer import ArticleAnalyzer
+from models.registry import registry
+from pipeline import AnalysisPipeline
+from responses import compact_response
+
+class LineSentencesNlp:
+    """registry.nlp with one sentence per line, which the parser keeps"""
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+
+    def __getattr__(self, name):
+        return getattr(self.nlp, name)
+
+    def __call__(self, text, disable=()):
+        doc = self.nlp.make_doc(text)
+        for token in doc:
+            token.is_sent_start = token.i == 0 or '\n' in doc[token.i - 1].text
+        with self.nlp.select_pipes(disable=disable):
+            return self.nlp(doc)
+
+def test_compact_sentences_come_from_the_parse_not_a_text_search(monkeypatch, installed_models):
+    nlp = LineSentencesNlp(registry.nlp)
+    monkeypatch.setattr(type(registry), 'nlp', property(lambda self: nlp))
+    # The reported "Wonderful!" also occurs, unreported, in the first sentence
+    text = 'A sign reading Wonderful! hung over the dull, dreary hall.\nWonderful!\nThe council met on Monday.'
+    analysis = ArticleAnalyzer('test').analyze_article(text)
+    assert [item['text'].strip() for item in analysis['bias_analysis']['emotional_language']] == ['Wonderful!']
+
+    response = {'status': 'success', 'analysis': analysis['bias_analysis'], 'keywords': analysis['keywords'],
+                'political_analysis': analysis['political_analysis'],
+                'sentence_spans': analysis['sentence_spans']}
+    compact = compact_response(response, text)
+    start, end = compact['sentences'][compact['analysis']['emotional_language'][0]['sentence']]
+    assert text[start:end] == 'Wonderful!'
+    assert start == text.index('\nWonderful!') + 1
+
+class WonderfulAnalyzer:
+    """Reports the sentence "Wonderful!" as emotional, with its offsets in the text it is given"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def analyze_article(self, text, on_keywords=None):
+        self.calls += 1
+        start = text.index('Wonderful!')
+        return {
+            'bias_analysis': {'sentiment_scores': {'compound': 0.6}, 'subjectivity_score': 0,
+                              'overall_bias_score': 0, 'bias_indicators': {},
+                              'emotional_language': [{'text': 'Wonderful!', 'intensity': 0.6}]},
+            'keywords': [],
+            'political_analysis': {},
+            'sentence_spans': {'bias_indicators': {}, 'emotional_language': [(start, start + len('Wonderful!'))]}
+        }
+
+def test_cached_offsets_follow_the_submitted_whitespace_and_line_endings():
+    analyzer = WonderfulAnalyzer()
+    pipeline = AnalysisPipeline(analyzer, None, ResultCache('analysis'), ResultCache('related'), ResultCache('gpt'))
+    # The same article under content_key, submitted three ways
+    texts = ['The council met.\r\nWonderful!\r\nIt ended.',
+             '\n\n    The council met.\nWonderful!\nIt ended.  ',
+             ' The council met.\nWonderful!\r\nIt ended.\r\n']
+    for text in texts:
+        response, _ = pipeline.run_local(text, sentence_spans=True)
+        compact = compact_response(response, text)
+        start, end = compact['sentences'][compact['analysis']['emotional_language'][0]['sentence']]
+        assert text[start:end] == 'Wonderful!'
+    assert analyzer.calls == 1
@@ -0,0 +1,31 @@
+from benchmarks.corpus import load_corpus
+from models.bias_analyzer import BiasAnalyzer, PoliticalAnalyzer
+from models.sentence_memo import SentenceMemo
+
+def without_memo(analyzer, namespace):
+    analyzer.sentence_memo = SentenceMemo(namespace, max_entries=0)
+    return analyzer
+
+def test_bias_memo_does_not_depend_on_earlier_articles(installed_models):
+    texts = [text for _, text in load_corpus(1)]
+    memoized = BiasAnalyzer()
+    for text in texts[:2]:
+        memoized.analyze(text)
+
+    expected = without_memo(BiasAnalyzer(), 'bias_sentences').analyze(texts[2])
+    assert memoized.analyze(texts[2]) == expected
+    assert memoized.sentence_memo.cache.hits > 0
+
+def test_political_memo_does_not_depend_on_earlier_articles(installed_models):
+    texts = [text for _, text in load_corpus(1)]
+    memoized = PoliticalAnalyzer()
+    for text in texts[:2]:
+        memoized.analyze_political_leaning(text)
+
+    expected = without_memo(PoliticalAnalyzer(), 'political_sentences').analyze_political_leaning(texts[2])
+    actual = memoized.analyze_political_leaning(texts[2])
+    # Indicators come out of sets, so their order is arbitrary
+    for result in (expected, actual):
+        for side in result['evidence']:
+            result['evidence'][side].sort()
+    assert actual == expected
@@ -0,0 +1,14 @@
+import pytest
+from upstream import RateLimitExceeded, TokenBucket, Upstream
+
+def test_a_call_rejected_by_one_bucket_takes_nothing_from_the_others():
+    requests = TokenBucket('test_requests', rate=0.001, capacity=2)
+    tokens = TokenBucket('test_tokens', rate=0.001, capacity=1000)
+    upstream = Upstream('test', {'requests': requests, 'tokens': tokens}, attempts=1)
+
+    assert upstream.call(None, lambda: 'first', budget=0.05, costs={'tokens': 1000}) == 'first'
+    with pytest.raises(RateLimitExceeded):
+        upstream.call(None, lambda: 'second', budget=0.05, costs={'tokens': 1000})
+    # Only the first call's request was spent
+    assert requests._tokens == pytest.approx(1, abs=0.01)
+    assert upstream.call(None, lambda: 'third', budget=0.05, costs={'tokens': 0}) == 'third'
@@ -0,0 +1,253 @@
+"""Shared client layer for the NewsAPI and OpenAI calls.
+
+Every call goes through an ``Upstream``, which:
+
+- coalesces concurrent identical calls (single flight), so a story that many
+  users read at once costs one upstream request
+- waits for a token bucket sized to the service's quota before each attempt
+- retries rate-limit (429), server (5xx) and connection errors with jittered
+  exponential backoff, honouring Retry-After, within the caller's time budget
+
+Buckets live in the process by default. Setting RATE_LIMIT_STATE_PATH keeps
+them in an SQLite file so the limits hold across all gunicorn workers.
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future
+import requests
+from config import Config
+from metrics import rate_limit_waits, upstream_coalesced, upstream_retries
+from sqlite_local import LocalConnection
+
+class RateLimitExceeded(Exception):
+    pass
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers with the same key share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+class SharedBucketState:
+    """Token bucket levels in SQLite, updated atomically so every worker draws from one quota"""
+
+    def __init__(self, path):
+        self.path = path
+        # Autocommit, so take() can hold a write lock with BEGIN IMMEDIATE
+        self._connection = LocalConnection(path, isolation_level=None)
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limits ('
+            'name TEXT PRIMARY KEY, tokens REAL, updated_at REAL)'
+        )
+
+    def take(self, name, rate, capacity, cost):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = conn.execute(
+                'SELECT tokens, updated_at FROM rate_limits WHERE name = ?', (name,)
+            ).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            wait = _wait_time(tokens, rate, cost)
+            if wait == 0:
+                tokens -= cost
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)',
+                (name, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def refund(self, name, capacity, cost):
+        conn = self._connection()
+        conn.execute(
+            'UPDATE rate_limits SET tokens = MIN(?, tokens + ?) WHERE name = ?',
+            (capacity, cost, name)
+        )
+
+class TokenBucket:
+    """Allow ``rate`` units per second on average with bursts of up to ``capacity``"""
+
+    def __init__(self, name, rate, capacity, shared=None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _take(self, cost):
+        """Take cost tokens and return 0, or return how long to wait before trying again"""
+        cost = min(cost, self.capacity)
+        if self.shared is not None:
+            return self.shared.take(self.name, self.rate, self.capacity, cost)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            wait = _wait_time(self._tokens, self.rate, cost)
+            if wait == 0:
+                self._tokens -= cost
+            return wait
+
+    def _refund(self, cost):
+        """Put back tokens a _take of the same cost took"""
+        cost = min(cost, self.capacity)
+        if self.shared is not None:
+            self.shared.refund(self.name, self.capacity, cost)
+            return
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + cost)
+
+    def acquire(self, cost=1, deadline=None):
+        acquire_all([(self, cost)], deadline)
+
+def acquire_all(costs, deadline=None):
+    """Take from every (bucket, cost) pair at once, or from none of them.
+
+    When one bucket is short, whatever was already taken from the others is
+    put back before waiting, so a call rejected or delayed by one limit does
+    not spend the quota of another.
+    """
+    while True:
+        taken = []
+        wait, limiting = 0, None
+        for bucket, cost in costs:
+            bucket_wait = bucket._take(cost)
+            if bucket_wait:
+                wait, limiting = bucket_wait, bucket
+                break
+            taken.append((bucket, cost))
+        if limiting is None:
+            return
+        for bucket, cost in taken:
+            bucket._refund(cost)
+        if deadline is not None and time.monotonic() + wait > deadline:
+            rate_limit_waits.inc(bucket=limiting.name, result='rejected')
+            raise RateLimitExceeded(f"{limiting.name} rate limit: no capacity within the time budget")
+        rate_limit_waits.inc(bucket=limiting.name, result='waited')
+        time.sleep(wait)
+
+def _wait_time(tokens, rate, cost):
+    if tokens >= cost:
+        return 0
+    return (cost - tokens) / rate if rate > 0 else float('inf')
+
+class Upstream:
+    def __init__(self, name, buckets=None, attempts=3, base_delay=0.5, max_delay=8.0):
+        self.name = name
+        # name -> TokenBucket; call() says how much of each a call uses
+        self.buckets = dict(buckets or {})
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.single_flight = SingleFlight()
+
+    def call(self, key, func, *args, budget=None, costs=None, **kwargs):
+        """Call func with coalescing (when key is not None), rate limiting and retries.
+
+        ``budget`` bounds the seconds spent waiting for the rate limit and
+        between retries. ``costs`` maps bucket names to how much of each
+        this call uses (default 1 from every bucket), e.g. ``{'tokens': 1800}``.
+        """
+        deadline = time.monotonic() + budget if budget else None
+        if key is None:
+            return self._call(func, args, kwargs, deadline, costs)
+        result, shared = self.single_flight.do(key, self._call, func, args, kwargs, deadline, costs)
+        if shared:
+            upstream_coalesced.inc(service=self.name)
+        return result
+
+    def _call(self, func, args, kwargs, deadline, costs):
+        for attempt in range(self.attempts):
+            acquire_all([(bucket, (costs or {}).get(name, 1)) for name, bucket in self.buckets.items()],
+                        deadline)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.attempts - 1 or not is_retryable(e):
+                    raise
+                # Full jitter spreads out the workers that were limited at the same moment
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, retry_after(e) or 0)
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    raise
+                upstream_retries.inc(service=self.name)
+                print(f"Retrying {self.name} in {delay:.2f}s: {e}")
+                time.sleep(delay)
+
+def status_code(error):
+    # openai.APIStatusError has status_code; requests.HTTPError has response
+    code = getattr(error, 'status_code', None)
+    if code is None:
+        response = getattr(error, 'response', None)
+        code = getattr(response, 'status_code', None)
+    return code
+
+def is_retryable(error):
+    code = status_code(error)
+    if code is not None:
+        return code == 429 or code >= 500
+    # NewsApiClient raises its JSON error body instead of an HTTP status
+    get_code = getattr(error, 'get_code', None)
+    if callable(get_code):
+        try:
+            return get_code() in ('rateLimited', 'unexpectedError')
+        except (KeyError, TypeError):
+            return False
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # openai.APIConnectionError and APITimeoutError, without importing openai here
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+def retry_after(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+_shared = SharedBucketState(Config.RATE_LIMIT_STATE_PATH) if Config.RATE_LIMIT_STATE_PATH else None
+
+newsapi_upstream = Upstream('newsapi', {
+    'requests': TokenBucket('newsapi_requests', Config.NEWSAPI_REQUESTS_PER_MINUTE / 60,
+                            Config.NEWSAPI_BURST, _shared)
+}, attempts=Config.UPSTREAM_RETRIES + 1)
+
+openai_upstream = Upstream('openai', {
+    'requests': TokenBucket('openai_requests', Config.OPENAI_REQUESTS_PER_MINUTE / 60,
+                            Config.OPENAI_BURST, _shared),
+    'tokens': TokenBucket('openai_tokens', Config.OPENAI_TOKENS_PER_MINUTE / 60,
+                          Config.OPENAI_TOKENS_PER_MINUTE, _shared)
+}, attempts=Config.UPSTREAM_RETRIES + 1)
@@ -1,4 +1,12 @@
 from app import app
+from config import Config
+from models.registry import warm_up
+
+# With `gunicorn --preload` this runs once in the master, so the forked
+# workers share the loaded models copy-on-write instead of each loading them.
+# PRELOAD_MODELS=false defers loading to the first request instead.
+if Config.PRELOAD_MODELS:
+    warm_up(freeze_gc=True)
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    app.run()